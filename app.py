@@ -1,42 +1,161 @@
-from flask import Flask, jsonify
+from flask import Flask, Response
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
 from config import Config
+from decimal import Decimal
+from functools import lru_cache
+import importlib
+import json
 import logging
-
-# Import routes
-from routes.genre_routes import genre_bp
-from routes.book_routes import book_bp
-from routes.user_routes import user_bp
-from routes.loan_routes import loan_bp
-from routes.external_routes import external_bp
-from routes.data_routes import data_bp
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+import threading
+import time
+import orjson
+
+# Blueprints registered by create_app: (name, module path, blueprint attribute, url prefix)
+# Route modules are imported only when their blueprint is registered
+_BLUEPRINTS = (
+    ('genres', 'routes.genre_routes', 'genre_bp', '/api/genres'),
+    ('books', 'routes.book_routes', 'book_bp', '/api/books'),
+    ('users', 'routes.user_routes', 'user_bp', '/api/users'),
+    ('loans', 'routes.loan_routes', 'loan_bp', '/api/loans'),
+    ('external', 'routes.external_routes', 'external_bp', '/api/external'),
+    ('data', 'routes.data_routes', 'data_bp', '/data'),
 )
 
+# Configure logging once, re-imports (e.g. under pytest) must not attach duplicate handlers
+if not logging.getLogger().handlers:
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+# Pre-serialized bodies for the error handlers
+_NOT_FOUND_BODY = b'{"error":"Resource not found"}'
+_BAD_REQUEST_BODY = b'{"error":"Bad request"}'
+_INTERNAL_ERROR_BODY = b'{"error":"Internal server error"}'
+
+# Pre-serialized body for the root endpoint
+_INDEX_BODY = json.dumps({
+    'message': 'Library Management System API',
+    'version': '1.0',
+    'status': 'Running',
+}).encode()
+
+# Health check results are reused for this many seconds before the database is probed again
+HEALTH_CACHE_TTL = 5
+_health_cache = {'ts': 0.0, 'body': None, 'status': 200}
+_health_lock = threading.Lock()
+
+
+def _get_health_status() -> tuple:
+    """
+    Get the cached health check result, probing the database when the cache has expired.
+    :return: tuple - (serialized JSON body, HTTP status code)
+    """
+
+    if _health_cache['body'] is not None and time.monotonic() - _health_cache['ts'] < HEALTH_CACHE_TTL:
+        return _health_cache['body'], _health_cache['status']
+
+    with _health_lock:
+        # Another thread may have refreshed the cache while we waited for the lock
+        if _health_cache['body'] is not None and time.monotonic() - _health_cache['ts'] < HEALTH_CACHE_TTL:
+            return _health_cache['body'], _health_cache['status']
+
+        try:
+            from models.database import test_connection
+            db_status = 'connected' if test_connection() else 'disconnected'
+            body = json.dumps({
+                'status': 'healthy',
+                'database': db_status,
+                'message': 'Health check successful'
+            }).encode()
+            status = 200
+        except Exception as e:
+            body = json.dumps({
+                'status': 'error',
+                'database': 'error',
+                'error': str(e)
+            }).encode()
+            status = 500
+
+        _health_cache.update(ts=time.monotonic(), body=body, status=status)
+        return body, status
+
+
+def _orjson_default(obj):
+    """
+    Serialize types orjson does not handle natively, matching Flask's default provider.
+    Model objects are encoded through their to_dict, so routes can hand them to jsonify directly.
+    :param obj: The object to serialize.
+    :return: A JSON-serializable representation of the object.
+    """
+
+    if isinstance(obj, Decimal):
+        return str(obj)
+    to_dict = getattr(obj, 'to_dict', None)
+    if to_dict is not None:
+        return to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class OrjsonProvider(JSONProvider):
+    """
+    JSON provider backed by orjson, which encodes dicts, lists and datetimes in C.
+    """
+
+    def dumps(self, obj, **kwargs) -> str:
+        """
+        Serialize data as JSON.
+        :param obj: The data to serialize.
+        :return: str - The JSON string.
+        """
+        # Dataclass models are passed through to _orjson_default so their to_dict computed fields are kept
+        return orjson.dumps(
+            obj,
+            default=_orjson_default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATACLASS
+        ).decode()
+
+    def loads(self, s, **kwargs):
+        """
+        Deserialize data as JSON.
+        :param s: Text or UTF-8 bytes.
+        :return: The deserialized data.
+        """
+        return orjson.loads(s)
+
+
+@lru_cache(maxsize=None)
+def _load_blueprint(module_path: str, attr: str):
+    """
+    Import a route module and return its blueprint, resolved once per process.
+    :param module_path: str - Dotted path of the route module.
+    :param attr: str - Name of the blueprint attribute in the module.
+    :return: Blueprint - The blueprint object.
+    """
+
+    return getattr(importlib.import_module(module_path), attr)
 
-def create_app(config_class=Config):
+
+def create_app(config_class=Config, only=None):
     """
     Create and configure the Flask application with all routes, blueprints, and error handlers.
 
     :param config_class: Config - Configuration class to load app settings from.
+    :param only: Iterable of blueprint names (e.g. ('genres',)) to register, all blueprints if None.
     :return: Flask app instance - The configured Flask application.
     """
 
     app = Flask(__name__)
+    app.json = OrjsonProvider(app)
     CORS(app)
     app.config.from_object(config_class)
 
     # Register blueprints
-    app.register_blueprint(genre_bp, url_prefix='/api/genres')
-    app.register_blueprint(book_bp, url_prefix='/api/books')
-    app.register_blueprint(user_bp, url_prefix='/api/users')
-    app.register_blueprint(loan_bp, url_prefix='/api/loans')
-    app.register_blueprint(external_bp, url_prefix='/api/external')
-    app.register_blueprint(data_bp, url_prefix='/data')
+    for name, module_path, attr, url_prefix in _BLUEPRINTS:
+        if only is not None and name not in only:
+            continue
+        app.register_blueprint(_load_blueprint(module_path, attr), url_prefix=url_prefix)
 
     # Root endpoint
     @app.route('/')
@@ -46,34 +165,19 @@ def create_app(config_class=Config):
         :return: JSON response with API message, version, status, and endpoints.
         """
 
-        return jsonify({
-            'message': 'Library Management System API',
-            'version': '1.0',
-            'status': 'Running',
-        })
+        return Response(_INDEX_BODY, mimetype='application/json')
 
     # Health check endpoint
     @app.route('/health')
     def health_check():
         """
         Health check endpoint to verify database connection status.
+        The result is cached for HEALTH_CACHE_TTL seconds so frequent probes do not hit the database.
         :return: JSON response indicating API and database health status.
         """
 
-        try:
-            from models.database import test_connection
-            db_status = 'connected' if test_connection() else 'disconnected'
-            return jsonify({
-                'status': 'healthy',
-                'database': db_status,
-                'message': 'Health check successful'
-            })
-        except Exception as e:
-            return jsonify({
-                'status': 'error',
-                'database': 'error',
-                'error': str(e)
-            }), 500
+        body, status = _get_health_status()
+        return Response(body, status=status, mimetype='application/json')
 
     # Error handlers
     @app.errorhandler(404)
@@ -83,7 +187,7 @@ def create_app(config_class=Config):
         :param error: The error raised.
         :return: JSON response with error message and 404 status.
         """
-        return jsonify({'error': 'Resource not found'}), 404
+        return Response(_NOT_FOUND_BODY, status=404, mimetype='application/json')
 
     @app.errorhandler(400)
     def bad_request(error):
@@ -92,7 +196,7 @@ def create_app(config_class=Config):
         :param error: The error raised.
         :return: JSON response with error message and 400 status.
         """
-        return jsonify({'error': 'Bad request'}), 400
+        return Response(_BAD_REQUEST_BODY, status=400, mimetype='application/json')
 
     @app.errorhandler(500)
     def internal_error(error):
@@ -101,7 +205,7 @@ def create_app(config_class=Config):
         :param error: The error raised.
         :return: JSON response with error message and 500 status.
         """
-        return jsonify({'error': 'Internal server error'}), 500
+        return Response(_INTERNAL_ERROR_BODY, status=500, mimetype='application/json')
 
     return app
 
@@ -1,17 +1,18 @@
-from typing import Dict, Any
+from dataclasses import dataclass
+from typing import Dict, Any, Optional
 
 
+@dataclass(slots=True, eq=False)
 class BookGenre:
-    def __init__(self, id: int = None, book_id: int = None, genre_id: int = None,):
-        """
-        Represents a relationship between a book and a genre.
-        :param id: The unique identifier for the book-genre relationship.
-        :param book_id: The unique identifier for the book.
-        :param genre_id: The unique identifier for the genre.
-        """
-        self.id = id
-        self.book_id = book_id
-        self.genre_id = genre_id
+    """
+    Represents a relationship between a book and a genre.
+    :param id: The unique identifier for the book-genre relationship.
+    :param book_id: The unique identifier for the book.
+    :param genre_id: The unique identifier for the genre.
+    """
+    id: Optional[int] = None
+    book_id: Optional[int] = None
+    genre_id: Optional[int] = None
 
     def to_dict(self) -> Dict[str, Any]:
         """
@@ -24,6 +25,16 @@ class BookGenre:
             'genre_id': self.genre_id
         }
 
+    @classmethod
+    def from_row(cls, row: tuple) -> 'BookGenre':
+        """
+        Creates a BookGenre instance from a database row tuple.
+        The row must hold the columns in constructor order (id, book_id, genre_id).
+        :param row: The row tuple returned by a tuple cursor.
+        :return: A BookGenre instance created from the provided row.
+        """
+        return cls(*row)
+
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'BookGenre':
         """
@@ -31,8 +42,4 @@ class BookGenre:
         :param data: The dictionary containing the book-genre relationship data.
         :return: A BookGenre instance created from the provided dictionary.
         """
-        return cls(
-            id=data.get('id'),
-            book_id=data.get('book_id'),
-            genre_id=data.get('genre_id')
-        )
\ No newline at end of file
+        return cls(**{key: data[key] for key in cls.__dataclass_fields__ if key in data})
\ No newline at end of file
@@ -1,36 +1,41 @@
-from typing import Dict, Any, List
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional
 
 
+@dataclass(slots=True, eq=False)
 class Book:
-    def __init__(self, id: int = None, isbn: str = None, title: str = None,
-                 author: str = None, publication_year: int = None,
-                 pages: int = None, language: str = 'English', description: str = None,
-                 copies_total: int = 1, copies_available: int = 1, genres: List[Dict] = None):
+    """
+    Represents a book in the library system.
+    :param id: The unique identifier for the book.
+    :param isbn: The International Standard Book Number of the book.
+    :param title: The title of the book.
+    :param author: The author of the book.
+    :param publication_year: The year the book was published.
+    :param pages: The number of pages in the book.
+    :param language: The language of the book, default is 'English'.
+    :param description: A brief description of the book.
+    :param copies_total: The total number of copies of the book available in the library.
+    :param copies_available: The number of copies currently available for loan.
+    :param genres: A list of genres associated with the book, each represented as a dictionary.
+    """
+    id: Optional[int] = None
+    isbn: Optional[str] = None
+    title: Optional[str] = None
+    author: Optional[str] = None
+    publication_year: Optional[int] = None
+    pages: Optional[int] = None
+    language: Optional[str] = 'English'
+    description: Optional[str] = None
+    copies_total: int = 1
+    copies_available: int = 1
+    genres: Optional[List[Dict]] = None
+
+    def __post_init__(self):
         """
-        Represents a book in the library system.
-        :param id: The unique identifier for the book.
-        :param isbn: The International Standard Book Number of the book.
-        :param title: The title of the book.
-        :param author: The author of the book.
-        :param publication_year: The year the book was published.
-        :param pages: The number of pages in the book.
-        :param language: The language of the book, default is 'English'.
-        :param description: A brief description of the book.
-        :param copies_total: The total number of copies of the book available in the library.
-        :param copies_available: The number of copies currently available for loan.
-        :param genres: A list of genres associated with the book, each represented as a dictionary.
+        Normalizes a missing genres list to an empty list.
         """
-        self.id = id
-        self.isbn = isbn
-        self.title = title
-        self.author = author
-        self.publication_year = publication_year
-        self.pages = pages
-        self.language = language
-        self.description = description
-        self.copies_total = copies_total
-        self.copies_available = copies_available
-        self.genres = genres or []
+        if self.genres is None:
+            self.genres = []
 
     @property
     def is_available(self) -> bool:
@@ -53,6 +58,7 @@ class Book:
         Converts the Book instance to a dictionary representation.
         :return: The dictionary representation of the Book instance.
         """
+        copies_available = self.copies_available
         return {
             'id': self.id,
             'isbn': self.isbn,
@@ -63,12 +69,23 @@ class Book:
             'language': self.language,
             'description': self.description,
             'copies_total': self.copies_total,
-            'copies_available': self.copies_available,
-            'copies_on_loan': self.copies_on_loan,
-            'is_available': self.is_available,
+            'copies_available': copies_available,
+            'copies_on_loan': self.copies_total - copies_available,
+            'is_available': copies_available > 0,
             'genres': self.genres
         }
 
+    @classmethod
+    def from_row(cls, row: tuple) -> 'Book':
+        """
+        Creates a Book instance from a database row tuple.
+        The row must hold the columns in constructor order (id, isbn, title, author, publication_year,
+        pages, language, description, copies_total, copies_available), optionally followed by genres.
+        :param row: The row tuple returned by a tuple cursor.
+        :return: A Book instance created from the provided row.
+        """
+        return cls(*row)
+
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'Book':
         """
@@ -76,16 +93,4 @@ class Book:
         :param data: The dictionary containing the book data.
         :return: A Book instance created from the provided dictionary.
         """
-        return cls(
-            id=data.get('id'),
-            isbn=data.get('isbn'),
-            title=data.get('title'),
-            author=data.get('author'),
-            publication_year=data.get('publication_year'),
-            pages=data.get('pages'),
-            language=data.get('language', 'English'),
-            description=data.get('description'),
-            copies_total=data.get('copies_total', 1),
-            copies_available=data.get('copies_available', 1),
-            genres=data.get('genres', [])
-        )
+        return cls(**{key: data[key] for key in cls.__dataclass_fields__ if key in data})
@@ -1,9 +1,14 @@
+import atexit
+import os
+import threading
+from contextlib import contextmanager
+
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2 import pool
+from psycopg2.extensions import connection as _PgConnection, cursor as _TupleCursor
+from psycopg2.extras import RealDictCursor, execute_values
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # consts for connecting to db
@@ -13,88 +18,357 @@ DB_NAME = "dbname"
 DB_USER = "admin"
 DB_PASSWORD = "Aa123456"
 
+# consts for the connection pool
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", 5))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", 20))
+# Seconds to wait for a free pooled connection before giving up
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 10))
+
+# Server-side prepared statements, disable behind a transaction-pooling pgbouncer where sessions are not sticky
+DB_USE_PREPARED = os.getenv("DB_USE_PREPARED", "1") != "0"
+
+# Statement names for queries prepared by text (prepared=True), shared by every pooled connection
+_PREPARED_NAMES = {}
+_PREPARED_NAMES_LOCK = threading.Lock()
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+# One slot per pooled connection, ThreadedConnectionPool raises instead of waiting once maxconn is checked out
+_POOL_SLOTS = threading.BoundedSemaphore(DB_POOL_MAX)
+
+
+class PreparingConnection(_PgConnection):
+    """
+    psycopg2 connection that remembers which server-side prepared statements it holds
+    Prepared statements live as long as the backend session, so the set is tied to the connection object
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+
+
+def _get_pool():
+    """
+    Get the module-level connection pool, creating it on first use
+    :return: psycopg2 ThreadedConnectionPool object
+    """
+    global _POOL
+    if _POOL is None:
+        with _POOL_LOCK:
+            if _POOL is None:
+                _POOL = pool.ThreadedConnectionPool(
+                    DB_POOL_MIN,
+                    DB_POOL_MAX,
+                    host=DB_HOST,
+                    port=DB_PORT,
+                    database=DB_NAME,
+                    user=DB_USER,
+                    password=DB_PASSWORD,
+                    # TCP keepalives stop idle pooled connections from being dropped silently by firewalls/NAT
+                    keepalives=1,
+                    keepalives_idle=30,
+                    connection_factory=PreparingConnection,
+                    cursor_factory=RealDictCursor
+                )
+                atexit.register(_POOL.closeall)
+    return _POOL
+
 
 def get_db_connection():
     """
-    Get database connection with error handling
+    Get database connection from the pool with error handling
+    Waits up to DB_POOL_TIMEOUT seconds when every pooled connection is checked out
+    The caller is responsible for handing it back with release_db_connection
     :return: psycopg2 connection object
     """
+    if not _POOL_SLOTS.acquire(timeout=DB_POOL_TIMEOUT):
+        logger.error(f"Database connection error: no pooled connection free after {DB_POOL_TIMEOUT}s")
+        raise pool.PoolError("connection pool exhausted")
     try:
-        conn = psycopg2.connect(
-            host=DB_HOST,
-            port=DB_PORT,
-            database=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            cursor_factory=RealDictCursor
-        )
-        return conn
+        return _get_pool().getconn()
     except psycopg2.Error as e:
+        _POOL_SLOTS.release()
         logger.error(f"Database connection error: {e}")
         raise
 
 
-def execute_query(query, params=None, fetch=False):
+def release_db_connection(conn):
+    """
+    Return a connection to the pool, discarding it if it has been closed or broken
+    :param conn: psycopg2 connection object obtained from get_db_connection
+    """
+    try:
+        _get_pool().putconn(conn, close=bool(conn.closed))
+    finally:
+        _POOL_SLOTS.release()
+
+
+@contextmanager
+def db_conn():
+    """
+    Context manager for transactional usage of a pooled connection
+    Commits on success, rolls back on exception and always returns the connection to the pool
+    :return: psycopg2 connection object
+    """
+    conn = get_db_connection()
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        release_db_connection(conn)
+
+
+def _run(query, params=None, mode='rowcount', prepared=None, dict_rows=True):
     """
-    Execute a query with error handling
+    Execute a query on a pooled connection and commit once
     :param query: SQL query to execute
     :param params: Parameters to pass to the query
-    :param fetch: Whether to fetch results (default: False)
-    :return: Result of the query if fetch is True, otherwise number of affected rows
+    :param mode: 'one' to fetch a single row, 'all' to fetch every row, 'rowcount' for the affected row count
+    :param prepared: Optional prepared statement name (or True to derive one from the query text)
+    :param dict_rows: Whether fetched rows should be dictionaries, tuples in column order otherwise
+    :return: Fetched row(s) or number of affected rows depending on mode
     """
-    conn = None
-    cursor = None
+    conn = get_db_connection()
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(query, params)
-
-        if fetch:
-            result = cursor.fetchall()
-            conn.commit()
-            return result
+        if prepared:
+            result = execute_prepared(conn, prepared, query, params, one=mode == 'one', dict_rows=dict_rows,
+                                      rowcount=mode == 'rowcount')
         else:
-            conn.commit()
-            return cursor.rowcount
-
+            with _open_cursor(conn, dict_rows) as cursor:
+                cursor.execute(query, params)
+                if mode == 'one':
+                    result = cursor.fetchone()
+                elif mode == 'all':
+                    result = cursor.fetchall()
+                else:
+                    result = cursor.rowcount
+        conn.commit()
+        return result
     except psycopg2.Error as e:
-        if conn:
-            conn.rollback()
+        conn.rollback()
         logger.error(f"Query execution error: {e}")
         raise
     finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
+        release_db_connection(conn)
 
 
-def execute_single_query(query, params=None):
+def execute_single_query(query, params=None, prepared=None, dict_rows=True):
     """
-    Execute a query and return single result
+    Execute a write query and return the single row it produces (e.g. INSERT/UPDATE ... RETURNING)
+    The commit is required here, single-row SELECTs should use execute_read(..., one=True) instead
     :param query: SQL query to execute
     :param params: Parameters to pass to the query
+    :param prepared: Optional prepared statement name (or True to derive one from the query text)
+    :param dict_rows: Whether the row should be a dictionary, a tuple in RETURNING column order otherwise
     :return: Single result from the query
     """
+    return _run(query, params, mode='one', prepared=prepared, dict_rows=dict_rows)
+
+
+def execute_values_query(query, rows, conn=None, page_size=100):
+    """
+    Execute a multi-row statement built with psycopg2 execute_values in a single round trip
+    Supports both standalone and transactional usage
+    :param query: SQL query with a single VALUES %s placeholder
+    :param rows: List of parameter tuples, one per row
+    :param conn: Optional database connection for transactional usage
+    :param page_size: Maximum number of rows sent per statement
+    :return: List of rows produced by a RETURNING clause (empty if none)
+    """
+    if not rows:
+        return []
+
+    fetch = 'RETURNING' in query.upper()
+    try:
+        if conn:
+            with conn.cursor() as cursor:
+                result = execute_values(cursor, query, rows, page_size=page_size, fetch=fetch)
+        else:
+            with db_conn() as standalone_conn:
+                with standalone_conn.cursor() as cursor:
+                    result = execute_values(cursor, query, rows, page_size=page_size, fetch=fetch)
+        return result or []
+    except psycopg2.Error as e:
+        logger.error(f"Bulk query execution error: {e}")
+        raise
+
+
+def _to_positional(query):
+    """
+    Convert psycopg2 %s placeholders to PostgreSQL positional $n parameters
+    :param query: SQL query using %s placeholders
+    :return: Query using $1..$n placeholders
+    """
+    parts = query.split('%s')
+    converted = parts[0]
+    for index, part in enumerate(parts[1:], start=1):
+        converted += f"${index}{part}"
+    return converted
+
+
+def _open_cursor(conn, dict_rows=True):
+    """
+    Open a cursor returning dict rows (connection default) or plain tuples
+    :param conn: Database connection
+    :param dict_rows: Whether rows should be dictionaries keyed by column name
+    :return: psycopg2 cursor object
+    """
+    return conn.cursor() if dict_rows else conn.cursor(cursor_factory=_TupleCursor)
+
+
+def _prepared_name(query):
+    """
+    Get the statement name for a query prepared by its text, assigning p0, p1, ... on first use
+    :param query: SQL query using %s placeholders
+    :return: Prepared statement name
+    """
+    name = _PREPARED_NAMES.get(query)
+    if name is None:
+        with _PREPARED_NAMES_LOCK:
+            name = _PREPARED_NAMES.setdefault(query, f"p{len(_PREPARED_NAMES)}")
+    return name
+
+
+def execute_prepared(conn, name, query, params=None, one=False, dict_rows=True, rowcount=False):
+    """
+    Execute a query through a server-side prepared statement, preparing it on first use per connection
+    :param conn: Pooled database connection
+    :param name: Name of the prepared statement, True to name it after the query text
+    :param query: SQL query using %s placeholders
+    :param params: Parameters to pass to the query
+    :param one: Whether to return only the first row (default: False)
+    :param dict_rows: Whether rows should be dictionaries, tuples in SELECT column order otherwise
+    :param rowcount: Whether to return the number of affected rows instead, for writes without RETURNING
+    :return: Number of affected rows if rowcount is True, single row (or None) if one is True,
+             otherwise list of rows
+    """
+    with _open_cursor(conn, dict_rows) as cursor:
+        prepared = getattr(conn, 'prepared', None)
+        if prepared is None or not DB_USE_PREPARED:
+            # Connection does not track prepared statements or they are disabled, run the query directly
+            cursor.execute(query, params)
+        else:
+            if name is True:
+                name = _prepared_name(query)
+            if name not in prepared:
+                positional_query = _to_positional(query)
+                cursor.execute(f"PREPARE {name} AS {positional_query}")
+                prepared.add(name)
+
+            param_count = len(params) if params else 0
+            if param_count:
+                cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * param_count)})", params)
+            else:
+                cursor.execute(f"EXECUTE {name}")
+
+        if rowcount:
+            return cursor.rowcount
+        return cursor.fetchone() if one else cursor.fetchall()
+
+
+def execute_read(query, params=None, one=False, prepared=None, dict_rows=True):
+    """
+    Execute a read-only query without an explicit commit
+    The connection runs in autocommit mode so a SELECT costs a single round trip
+    :param query: SQL query to execute
+    :param params: Parameters to pass to the query
+    :param one: Whether to return only the first row (default: False)
+    :param prepared: Optional prepared statement name (or True to derive one from the query text),
+                     runs the query through execute_prepared
+    :param dict_rows: Whether rows should be dictionaries, tuples in SELECT column order otherwise
+    :return: Single row (or None) if one is True, otherwise list of rows
+    """
     conn = None
     cursor = None
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
+        conn.autocommit = True
+        if prepared:
+            return execute_prepared(conn, prepared, query, params, one=one, dict_rows=dict_rows)
+        cursor = _open_cursor(conn, dict_rows)
         cursor.execute(query, params)
-        result = cursor.fetchone()
-        conn.commit()
-        return result
+        return cursor.fetchone() if one else cursor.fetchall()
     except psycopg2.Error as e:
-        if conn:
-            conn.rollback()
-        logger.error(f"Single query execution error: {e}")
+        logger.error(f"Read query execution error: {e}")
         raise
     finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
+        try:
+            if cursor:
+                cursor.close()
+            if conn and not conn.closed:
+                conn.autocommit = False
+        finally:
+            # Always hand the connection back, a dead one would otherwise hold its pool slot forever
+            if conn:
+                release_db_connection(conn)
+
+
+def execute_paged(query, params, cursor_col, last_value=None, limit=50):
+    """
+    Execute a SELECT with keyset pagination so only one bounded page is ever fetched
+    :param query: SELECT query without ORDER BY/LIMIT, must return the cursor column
+    :param params: Parameters to pass to the query
+    :param cursor_col: Unique, indexed column the pages are ordered by (e.g. id)
+    :param last_value: Cursor value of the last row of the previous page, None for the first page
+    :param limit: Maximum number of rows to return
+    :return: Tuple of (list of rows, cursor value for the next page or None if this is the last page)
+    """
+    paged_query = f"SELECT * FROM ({query}) AS page"
+    paged_params = list(params or ())
+    if last_value is not None:
+        paged_query += f" WHERE {cursor_col} > %s"
+        paged_params.append(last_value)
+    paged_query += f" ORDER BY {cursor_col} LIMIT %s"
+    paged_params.append(limit)
+
+    rows = execute_read(paged_query, paged_params)
+    next_value = rows[-1][cursor_col] if len(rows) == limit else None
+    return rows, next_value
+
+
+def stream_query(query, params=None, chunk_size=500, dict_rows=True):
+    """
+    Stream the rows of a SELECT through a server-side (named) cursor
+    Rows are fetched from PostgreSQL chunk_size at a time, so memory stays bounded for large results
+    :param query: SQL query to execute
+    :param params: Parameters to pass to the query
+    :param chunk_size: Number of rows fetched per round trip
+    :param dict_rows: Whether rows should be dictionaries, tuples in SELECT column order otherwise
+    :return: Generator yielding rows
+    """
+    conn = get_db_connection()
+    try:
+        cursor_factory = None if dict_rows else _TupleCursor
+        with conn.cursor(name='stream_query', cursor_factory=cursor_factory) as cursor:
+            cursor.itersize = chunk_size
+            cursor.execute(query, params)
+            for row in cursor:
+                yield row
+    except psycopg2.Error as e:
+        logger.error(f"Stream query execution error: {e}")
+        raise
+    finally:
+        try:
+            # End the read transaction the named cursor lived in before handing the connection back
+            if not conn.closed:
+                conn.rollback()
+        finally:
+            release_db_connection(conn)
+
+
+def execute_write(query, params=None, prepared=None):
+    """
+    Execute a write query and commit once
+    :param query: SQL query to execute
+    :param params: Parameters to pass to the query
+    :param prepared: Optional prepared statement name (or True to derive one from the query text)
+    :return: Number of affected rows, read from cursor.rowcount without fetching
+    """
+    return _run(query, params, prepared=prepared)
 
 
 def test_connection():
@@ -106,11 +380,13 @@ def test_connection():
         print(f"Connecting to database: {DB_HOST}:{DB_PORT}/{DB_NAME}")
         conn = get_db_connection()
         cursor = conn.cursor()
-        cursor.execute("SELECT version();")
-        version = cursor.fetchone()
-        cursor.close()
-        conn.close()
-        logger.info(f"Connected to PostgreSQL: {version[0]}")
+        try:
+            cursor.execute("SELECT version();")
+            version = cursor.fetchone()
+            cursor.close()
+        finally:
+            release_db_connection(conn)
+        logger.info(f"Connected to PostgreSQL: {version['version']}")
         return True
     except psycopg2.OperationalError as e:
         logger.error(f"Database connection failed: {e}")
@@ -127,12 +403,9 @@ if __name__ == "__main__":
         with open('schema.sql', 'r', encoding='utf-8') as file:
             sql_content = file.read()
 
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(sql_content)
-        conn.commit()
+        with db_conn() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(sql_content)
         print("Tables created successfully!")
-        cursor.close()
-        conn.close()
     except Exception as e:
         print(f"Error: {e}")
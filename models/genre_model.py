@@ -1,17 +1,18 @@
-from typing import Dict, Any
+from dataclasses import dataclass
+from typing import Dict, Any, Optional
 
 
+@dataclass(slots=True, eq=False)
 class Genre:
-    def __init__(self, id: int = None, name: str = None, description: str = None):
-        """
-        Represents a genre in the library system.
-        :param id: The unique identifier for the genre.
-        :param name: The name of the genre.
-        :param description: A brief description of the genre.
-        """
-        self.id = id
-        self.name = name
-        self.description = description
+    """
+    Represents a genre in the library system.
+    :param id: The unique identifier for the genre.
+    :param name: The name of the genre.
+    :param description: A brief description of the genre.
+    """
+    id: Optional[int] = None
+    name: Optional[str] = None
+    description: Optional[str] = None
 
     def to_dict(self) -> Dict[str, Any]:
         """
@@ -24,6 +25,16 @@ class Genre:
             'description': self.description
         }
 
+    @classmethod
+    def from_row(cls, row: tuple) -> 'Genre':
+        """
+        Creates a Genre instance from a database row tuple.
+        The row must hold the columns in constructor order (id, name, description).
+        :param row: The row tuple returned by a tuple cursor.
+        :return: A Genre instance created from the provided row.
+        """
+        return cls(*row)
+
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'Genre':
         """
@@ -31,8 +42,4 @@ class Genre:
         :param data: The dictionary containing the genre data.
         :return: A Genre instance created from the provided dictionary.
         """
-        return cls(
-            id=data.get('id'),
-            name=data.get('name'),
-            description=data.get('description')
-        )
\ No newline at end of file
+        return cls(**{key: data[key] for key in cls.__dataclass_fields__ if key in data})
\ No newline at end of file
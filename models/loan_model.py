@@ -1,30 +1,64 @@
 from datetime import datetime, timedelta
-from typing import Dict, Any
+from dataclasses import dataclass, InitVar
+from functools import lru_cache
+from typing import Dict, Any, Optional
+import time
 
+# Bound once so hot paths skip the attribute lookup on the datetime class
+_utcnow = datetime.utcnow
+_td = timedelta
 
+
+@lru_cache(maxsize=1)
+def _utcnow_cached(ttl_hash: int) -> datetime:
+    """
+    Get the current UTC time, memoized per ttl_hash bucket.
+    :param ttl_hash: The time bucket the cached value belongs to.
+    :return: The current UTC datetime.
+    """
+    return _utcnow()
+
+
+def _now() -> datetime:
+    """
+    Get the current UTC time at half-second resolution, shared by every loan serialized in that window.
+    :return: The current UTC datetime.
+    """
+    return _utcnow_cached(int(time.time() * 2))
+
+
+@dataclass(slots=True, eq=False)
 class Loan:
-    def __init__(self, id: int = None, user_id: int = None, book_id: int = None,
-                 loan_date: datetime = None, due_date: datetime = None,
-                 returned_date: datetime = None, fine_amount: float = 0.0,
-                 loan_period_days: int = 14):
-        """
-        Represents a loan of a book to a user in the library system.
-        :param id: The unique identifier for the loan.
-        :param user_id: The unique identifier for the user who borrowed the book.
-        :param book_id: The unique identifier for the book being borrowed.
-        :param loan_date: The date when the book was borrowed. Defaults to the current date and time.
-        :param due_date: The date when the book is due to be returned. Defaults to 14 days after the loan date.
-        :param returned_date: The date when the book was returned. Defaults to None if not returned yet.
-        :param fine_amount: The amount of fine incurred for late return. Defaults to 0.0.
-        :param loan_period_days: The number of days the book can be borrowed before it is due. Defaults to 14 days.
-        """
-        self.id = id
-        self.user_id = user_id
-        self.book_id = book_id
-        self.loan_date = loan_date or datetime.utcnow()
-        self.due_date = due_date or (self.loan_date + timedelta(days=loan_period_days))
-        self.returned_date = returned_date
-        self.fine_amount = fine_amount
+    """
+    Represents a loan of a book to a user in the library system.
+    :param id: The unique identifier for the loan.
+    :param user_id: The unique identifier for the user who borrowed the book.
+    :param book_id: The unique identifier for the book being borrowed.
+    :param loan_date: The date when the book was borrowed. Defaults to the current date and time.
+    :param due_date: The date when the book is due to be returned. Defaults to 14 days after the loan date.
+    :param returned_date: The date when the book was returned. Defaults to None if not returned yet.
+    :param fine_amount: The amount of fine incurred for late return. Defaults to 0.0.
+    :param loan_period_days: The number of days the book can be borrowed before it is due. Defaults to 14 days.
+    """
+    id: Optional[int] = None
+    user_id: Optional[int] = None
+    book_id: Optional[int] = None
+    loan_date: Optional[datetime] = None
+    due_date: Optional[datetime] = None
+    returned_date: Optional[datetime] = None
+    fine_amount: float = 0.0
+    loan_period_days: InitVar[int] = 14
+
+    def __post_init__(self, loan_period_days: int, _utcnow=_utcnow, _td=_td):
+        """
+        Fills in the loan and due dates when they are not provided.
+        The clock and timedelta are bound as default arguments so they are read as fast locals.
+        :param loan_period_days: The number of days the book can be borrowed before it is due.
+        """
+        if not self.loan_date:
+            self.loan_date = _utcnow()
+        if not self.due_date:
+            self.due_date = self.loan_date + _td(days=loan_period_days)
 
     @property
     def is_overdue(self) -> bool:
@@ -32,9 +66,7 @@ class Loan:
         Checks if the loan is overdue.
         :return: True if the book is overdue, False otherwise.
         """
-        if self.returned_date:
-            return False
-        return datetime.utcnow() > self.due_date
+        return self._is_overdue(_now())
 
     @property
     def days_overdue(self) -> int:
@@ -42,9 +74,25 @@ class Loan:
         Calculates the number of days the loan is overdue.
         :return: The number of days overdue, or 0 if not overdue.
         """
-        if not self.is_overdue:
+        return self._days_overdue(_now())
+
+    def _is_overdue(self, now: datetime) -> bool:
+        """
+        Checks if the loan is overdue at the given time.
+        :param now: The current UTC time.
+        :return: True if the book is overdue, False otherwise.
+        """
+        return self.returned_date is None and now > self.due_date
+
+    def _days_overdue(self, now: datetime) -> int:
+        """
+        Calculates the number of days the loan is overdue at the given time.
+        :param now: The current UTC time.
+        :return: The number of days overdue, or 0 if not overdue.
+        """
+        if not self._is_overdue(now):
             return 0
-        return (datetime.utcnow() - self.due_date).days
+        return (now - self.due_date).days
 
     def calculate_fine(self, fine_per_day: float = 1.0) -> float:
         """
@@ -52,8 +100,9 @@ class Loan:
         :param fine_per_day: The fine amount charged per day of delay. Defaults to 1.0.
         :return: The total fine amount for the overdue loan.
         """
-        if self.days_overdue > 0:
-            self.fine_amount = self.days_overdue * fine_per_day
+        days_overdue = self.days_overdue
+        if days_overdue > 0:
+            self.fine_amount = days_overdue * fine_per_day
         return self.fine_amount
 
     def to_dict(self) -> Dict[str, Any]:
@@ -61,18 +110,30 @@ class Loan:
         Converts the Loan instance to a dictionary representation.
         :return: The dictionary representation of the Loan instance.
         """
+        now = _now()
         return {
             'id': self.id,
             'user_id': self.user_id,
             'book_id': self.book_id,
-            'loan_date': self.loan_date.isoformat() if self.loan_date else None,
-            'due_date': self.due_date.isoformat() if self.due_date else None,
-            'returned_date': self.returned_date.isoformat() if self.returned_date else None,
+            'loan_date': self.loan_date,
+            'due_date': self.due_date,
+            'returned_date': self.returned_date,
             'fine_amount': self.fine_amount,
-            'is_overdue': self.is_overdue,
-            'days_overdue': self.days_overdue,
+            'is_overdue': self._is_overdue(now),
+            'days_overdue': self._days_overdue(now),
         }
 
+    @classmethod
+    def from_row(cls, row: tuple) -> 'Loan':
+        """
+        Creates a Loan instance from a database row tuple.
+        The row must hold the columns in constructor order (id, user_id, book_id, loan_date, due_date,
+        returned_date, fine_amount).
+        :param row: The row tuple returned by a tuple cursor.
+        :return: A Loan instance created from the provided row.
+        """
+        return cls(*row)
+
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'Loan':
         """
@@ -80,13 +141,5 @@ class Loan:
         :param data: The dictionary containing the loan data.
         :return: A Loan instance created from the provided dictionary.
         """
-        return cls(
-            id=data.get('id'),
-            user_id=data.get('user_id'),
-            book_id=data.get('book_id'),
-            loan_date=data.get('loan_date'),
-            due_date=data.get('due_date'),
-            returned_date=data.get('returned_date'),
-            fine_amount=data.get('fine_amount', 0.0),
-        )
+        return cls(**{key: data[key] for key in cls.__dataclass_fields__ if key in data})
     
\ No newline at end of file
@@ -60,19 +60,43 @@ CREATE TABLE IF NOT EXISTS loans (
 
 -- Create indexes for better performance
 CREATE INDEX IF NOT EXISTS idx_books_isbn ON books(isbn);
-CREATE INDEX IF NOT EXISTS idx_books_title ON books(title);
 CREATE INDEX IF NOT EXISTS idx_books_author ON books(author);
 
-CREATE INDEX IF NOT EXISTS idx_book_genres_book_id ON book_genres(book_id);
-CREATE INDEX IF NOT EXISTS idx_book_genres_genre_id ON book_genres(genre_id);
+-- Title listings are ordered by (title, id), the partial index serves the available-books listing
+DROP INDEX IF EXISTS idx_books_title;
+CREATE INDEX IF NOT EXISTS idx_books_title_id ON books(title, id);
+CREATE INDEX IF NOT EXISTS idx_books_available_title_id ON books(title, id) WHERE copies_available > 0;
+
+-- Trigram index for the substring search on title/author (ILIKE) and isbn (LIKE)
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS idx_books_search_trgm ON books
+    USING gin (title gin_trgm_ops, author gin_trgm_ops, isbn gin_trgm_ops);
+
+-- UNIQUE(book_id, genre_id) already indexes lookups by book, (genre_id, book_id) serves lookups by genre
+DROP INDEX IF EXISTS idx_book_genres_book_id;
+DROP INDEX IF EXISTS idx_book_genres_genre_id;
+CREATE INDEX IF NOT EXISTS idx_book_genres_genre_id_book_id ON book_genres(genre_id, book_id);
+
+-- Genre lookups by name are case-insensitive (LOWER(name) = %s), which the plain UNIQUE(name) index cannot serve
+CREATE INDEX IF NOT EXISTS idx_genres_name_lower ON genres(LOWER(name));
 
 CREATE INDEX IF NOT EXISTS idx_users_username ON users(username);
 CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
 
-CREATE INDEX IF NOT EXISTS idx_loans_user_id ON loans(user_id);
-CREATE INDEX IF NOT EXISTS idx_loans_book_id ON loans(book_id);
-CREATE INDEX IF NOT EXISTS idx_loans_due_date ON loans(due_date);
-CREATE INDEX IF NOT EXISTS idx_loans_returned_date ON loans(returned_date);
+-- Loan histories are listed newest first per user/book, the leading column also serves the foreign keys
+DROP INDEX IF EXISTS idx_loans_user_id;
+DROP INDEX IF EXISTS idx_loans_book_id;
+CREATE INDEX IF NOT EXISTS idx_loans_user_id_loan_date ON loans(user_id, loan_date DESC);
+CREATE INDEX IF NOT EXISTS idx_loans_book_id_loan_date ON loans(book_id, loan_date DESC);
+CREATE INDEX IF NOT EXISTS idx_loans_loan_date ON loans(loan_date DESC);
+
+-- Active loans (returned_date IS NULL) are a small slice of the table, partial indexes serve the
+-- overdue listing/count and the per-user and per-book active loan counts
+DROP INDEX IF EXISTS idx_loans_due_date;
+DROP INDEX IF EXISTS idx_loans_returned_date;
+CREATE INDEX IF NOT EXISTS idx_loans_active_due_date ON loans(due_date) WHERE returned_date IS NULL;
+CREATE INDEX IF NOT EXISTS idx_loans_active_user_id ON loans(user_id) WHERE returned_date IS NULL;
+CREATE INDEX IF NOT EXISTS idx_loans_active_book_id ON loans(book_id) WHERE returned_date IS NULL;
 
 
 -- Insert sample data
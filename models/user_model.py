@@ -1,63 +1,125 @@
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Dict, Any
-from werkzeug.security import generate_password_hash, check_password_hash
+from typing import Dict, Any, Optional
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+from gevent import get_hub
+from gevent.monkey import is_module_patched
+from werkzeug.security import check_password_hash
 
+# argon2id hasher used for all new and re-hashed passwords
+_ph = PasswordHasher(time_cost=2, memory_cost=64 * 1024, parallelism=1)
 
+# Prefixes of password hashes produced by werkzeug before the switch to argon2
+_LEGACY_HASH_PREFIXES = ('pbkdf2:', 'scrypt:')
+
+
+def _run_kdf(func, *args):
+    """
+    Run a password hashing function without stalling other requests.
+    Under gevent (wsgi.py) every greenlet shares one OS thread, so the KDF runs on the hub's native
+    threadpool while the calling greenlet waits; otherwise it is called directly, argon2-cffi already
+    releases the GIL while hashing.
+    :param func: The hashing or verification function.
+    :param args: Arguments to pass to func.
+    :return: The result of func.
+    """
+    if is_module_patched('threading'):
+        return get_hub().threadpool.apply(func, args)
+    return func(*args)
+
+
+def _verify_password(password_hash: str, password: str) -> bool:
+    """
+    Verify a password against an argon2 hash or a legacy werkzeug hash.
+    :param password_hash: The stored password hash.
+    :param password: The plain text password to check.
+    :return: True if the password matches, False otherwise.
+    """
+    if not password_hash:
+        return False
+    if password_hash.startswith(_LEGACY_HASH_PREFIXES):
+        return check_password_hash(password_hash, password)
+    try:
+        return _ph.verify(password_hash, password)
+    except (VerificationError, InvalidHashError):
+        return False
+
+
+@dataclass(slots=True, eq=False)
 class User:
-    def __init__(self, id: int = None, username: str = None, email: str = None,
-                 password_hash: str = None, first_name: str = None, last_name: str = None,
-                 phone: str = None, address: str = None, membership_date: datetime = None,
-                 max_loans: int = 5):
-        """
-        Represents a user in the library system.
-        :param id: The unique identifier for the user.
-        :param username: The username of the user.
-        :param email: The email address of the user.
-        :param password_hash: The hashed password of the user.
-        :param first_name: The first name of the user.
-        :param last_name: The last name of the user.
-        :param phone: The phone number of the user.
-        :param address: The address of the user.
-        :param membership_date: The date when the user became a member. Defaults to the current date and time.
-        :param max_loans: The maximum number of books the user can borrow at a time. Defaults to 5.
-        """
-        self.id = id
-        self.username = username
-        self.email = email
-        self.password_hash = password_hash
-        self.first_name = first_name
-        self.last_name = last_name
-        self.phone = phone
-        self.address = address
-        self.membership_date = membership_date or datetime.utcnow()
-        self.max_loans = max_loans
+    """
+    Represents a user in the library system.
+    :param id: The unique identifier for the user.
+    :param username: The username of the user.
+    :param email: The email address of the user.
+    :param password_hash: The hashed password of the user.
+    :param first_name: The first name of the user.
+    :param last_name: The last name of the user.
+    :param phone: The phone number of the user.
+    :param address: The address of the user.
+    :param membership_date: The date when the user became a member. Defaults to the current date and time.
+    :param max_loans: The maximum number of books the user can borrow at a time. Defaults to 5.
+    """
+    id: Optional[int] = None
+    username: Optional[str] = None
+    email: Optional[str] = None
+    password_hash: Optional[str] = field(default=None, repr=False)
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    phone: Optional[str] = None
+    address: Optional[str] = None
+    membership_date: Optional[datetime] = None
+    max_loans: int = 5
+    _full_name: Optional[str] = field(default=None, init=False, repr=False)
+
+    def __post_init__(self):
+        """
+        Fills in the membership date when it is not provided.
+        """
+        if not self.membership_date:
+            self.membership_date = datetime.utcnow()
 
     def set_password(self, password: str):
         """
         Hash and set password
         :param password: The plain text password to be hashed and stored.
         """
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = _run_kdf(_ph.hash, password)
 
     def check_password(self, password: str) -> bool:
         """
         Check if provided password matches
+        Legacy werkzeug hashes are still verified so existing users can log in and be re-hashed.
         :param password: The plain text password to check against the stored hash.
         :return: True if the password matches, False otherwise.
         """
-        return check_password_hash(self.password_hash, password)
+        return _run_kdf(_verify_password, self.password_hash, password)
+
+    def needs_rehash(self) -> bool:
+        """
+        Check if the stored hash is a legacy werkzeug hash or uses outdated argon2 parameters.
+        :return: True if the password should be re-hashed after a successful login, False otherwise.
+        """
+        if self.password_hash.startswith(_LEGACY_HASH_PREFIXES):
+            return True
+        return _ph.check_needs_rehash(self.password_hash)
 
     @property
     def full_name(self) -> str:
         """
         Returns the full name of the user by combining first and last names.
+        The string is built on first access and reused afterwards.
         :return: str: The full name of the user.
         """
-        return f"{self.first_name} {self.last_name}"
+        if self._full_name is None:
+            self._full_name = f"{self.first_name} {self.last_name}"
+        return self._full_name
 
     def to_dict(self) -> Dict[str, Any]:
         """
         Converts the User instance to a dictionary representation.
+        Datetimes are left as-is, the orjson JSON provider renders them in ISO 8601 format.
         :return: Dict[str, Any]: The dictionary representation of the User instance.
         """
         return {
@@ -69,10 +131,21 @@ class User:
             'full_name': self.full_name,
             'phone': self.phone,
             'address': self.address,
-            'membership_date': self.membership_date.isoformat() if self.membership_date else None,
+            'membership_date': self.membership_date,
             'max_loans': self.max_loans
         }
 
+    @classmethod
+    def from_row(cls, row: tuple) -> 'User':
+        """
+        Creates a User instance from a database row tuple.
+        The row must hold the columns in constructor order (id, username, email, password_hash, first_name,
+        last_name, phone, address, membership_date, max_loans).
+        :param row: The row tuple returned by a tuple cursor.
+        :return: User: A User instance created from the provided row.
+        """
+        return cls(*row)
+
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'User':
         """
@@ -80,16 +153,4 @@ class User:
         :param data: The dictionary containing the user data.
         :return: User: A User instance created from the provided dictionary.
         """
-        return cls(
-            id=data.get('id'),
-            username=data.get('username'),
-            email=data.get('email'),
-            password_hash=data.get('password_hash'),
-            first_name=data.get('first_name'),
-            last_name=data.get('last_name'),
-            phone=data.get('phone'),
-            address=data.get('address'),
-            membership_date=data.get('membership_date'),
-            max_loans=data.get('max_loans', 5)
-        )
-    
\ No newline at end of file
+        return cls(**{key: data[key] for key in cls.__dataclass_fields__ if key in data})
@@ -1,10 +1,20 @@
-from typing import List, Optional, Dict, Any
-from models.database import get_db_connection, execute_query, execute_single_query
+from itertools import groupby
+from operator import itemgetter
+from typing import Iterator, List, Optional, Dict, Any, Tuple
+from models.database import execute_read, execute_write, execute_single_query, execute_values_query, \
+    stream_query
 from models.book_genre_model import BookGenre
+from utils.ttl_cache import TTLCache, MISSING
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Genres per book keyed by book_id, entries expire after GENRES_CACHE_TTL seconds and are
+# dropped by the write methods of BookGenreRepository, evicted least recently used first
+GENRES_CACHE_TTL = 30
+_genres_cache = TTLCache(maxsize=10000, ttl=GENRES_CACHE_TTL)
+_invalidate_genres = _genres_cache.pop
+
 
 class BookGenreRepository:
     """
@@ -32,18 +42,56 @@ class BookGenreRepository:
                 with conn.cursor() as cursor:
                     cursor.execute(query, (book_genre.book_id, book_genre.genre_id))
                     result = cursor.fetchone()
-                    if result:
-                        return BookGenre.from_dict(dict(result))
-                    return None
             else:
                 # Use standalone execution
                 result = execute_single_query(query, (book_genre.book_id, book_genre.genre_id))
-                if result:
-                    return BookGenre.from_dict(dict(result))
-                return None
+            if result:
+                # RETURNING fixes the column order, build the object positionally
+                return BookGenre(result['id'], result['book_id'], result['genre_id'])
+            return None
         except Exception as e:
-            logger.error(f"Error creating book-genre relationship: {e}")
+            logger.error("Error creating book-genre relationship: %s", e)
             raise
+        finally:
+            _invalidate_genres(book_genre.book_id)
+
+    @staticmethod
+    def create_many(pairs: List[Tuple[int, int]], conn=None) -> List[BookGenre]:
+        """
+        Create many book-genre relationships in a single round trip - supports both standalone and transactional usage
+        Existing relationships are skipped
+        :param pairs: List of (book_id, genre_id) tuples
+        :param conn: Optional database connection for transactional usage
+        :return: List of created BookGenre objects
+        """
+
+        query = """
+            INSERT INTO book_genres (book_id, genre_id)
+            VALUES %s
+            ON CONFLICT (book_id, genre_id) DO NOTHING
+            RETURNING id, book_id, genre_id
+        """
+        try:
+            results = execute_values_query(query, pairs, conn=conn, page_size=1000)
+            return [BookGenre.from_dict(row) for row in results]
+        except Exception as e:
+            logger.error("Error bulk creating book-genre relationships: %s", e)
+            raise
+        finally:
+            _invalidate_genres(*{book_id for book_id, _ in pairs})
+
+    @staticmethod
+    def bulk_create(book_id: int, genre_ids: List[int], conn=None) -> List[BookGenre]:
+        """
+        Create relationships between a book and several genres in a single statement
+        Supports both standalone and transactional usage, existing relationships are skipped
+        :param book_id: ID of the book
+        :param genre_ids: List of genre IDs to link to the book
+        :param conn: Optional database connection for transactional usage
+        :return: List of created BookGenre objects
+        """
+
+        return BookGenreRepository.create_many([(book_id, genre_id) for genre_id in genre_ids], conn=conn)
 
     @staticmethod
     def get_by_id(book_genre_id: int) -> Optional[BookGenre]:
@@ -55,19 +103,20 @@ class BookGenreRepository:
 
         query = "SELECT id, book_id, genre_id FROM book_genres WHERE id = %s"
         try:
-            result = execute_single_query(query, (book_genre_id,))
+            result = execute_read(query, (book_genre_id,), one=True, prepared='book_genre_by_id', dict_rows=False)
             if result:
-                return BookGenre.from_dict(dict(result))
+                return BookGenre.from_row(result)
             return None
         except Exception as e:
-            logger.error(f"Error getting book-genre by id {book_genre_id}: {e}")
+            logger.error("Error getting book-genre by id %s: %s", book_genre_id, e)
             raise
 
     @staticmethod
-    def get_genres_by_book_id(book_id: int) -> List[Dict[str, Any]]:
+    def get_genres_by_book_id(book_id: int, conn=None) -> List[Dict[str, Any]]:
         """
-        Get all genres for a specific book
+        Get all genres for a specific book, served from a short-lived in-process cache when possible
         :param book_id: ID of the book
+        :param conn: Optional database connection for transactional usage, reads through it bypass the cache
         :return: List of dictionaries containing genre details
         """
 
@@ -79,35 +128,92 @@ class BookGenreRepository:
             ORDER BY g.name
         """
         try:
-            results = execute_query(query, (book_id,), fetch=True)
-            return [dict(row) for row in results]
+            if conn:
+                # Use provided connection (transactional), its uncommitted view must not be cached
+                with conn.cursor() as cursor:
+                    cursor.execute(query, (book_id,))
+                    return cursor.fetchall()
+
+            cached = _genres_cache.get(book_id)
+            if cached is not MISSING:
+                return list(cached)
+
+            results = execute_read(query, (book_id,), prepared='genres_by_book_id')
+            _genres_cache.set(book_id, results)
+            # RealDictCursor rows already are dicts, no copy needed
+            return list(results)
+        except Exception as e:
+            logger.error("Error getting genres for book %s: %s", book_id, e)
+            raise
+
+    @staticmethod
+    def get_genres_by_book_ids(book_ids: List[int]) -> Dict[int, List[Dict[str, Any]]]:
+        """
+        Get the genres of several books with a single query
+        :param book_ids: List of book IDs
+        :return: Dictionary mapping each book ID to its list of genre dictionaries (books without genres are omitted)
+        """
+
+        if not book_ids:
+            return {}
+
+        query = """
+            SELECT bg.book_id, g.id, g.name, g.description
+            FROM genres g
+            JOIN book_genres bg ON g.id = bg.genre_id
+            WHERE bg.book_id = ANY(%s::integer[])
+            ORDER BY bg.book_id, g.name
+        """
+        try:
+            results = execute_read(query, (list(book_ids),), dict_rows=False)
+            # Rows arrive sorted by book_id, so each book's genres form one contiguous group
+            return {
+                book_id: [{'id': genre_id, 'name': name, 'description': description}
+                          for _, genre_id, name, description in rows]
+                for book_id, rows in groupby(results, key=itemgetter(0))
+            }
         except Exception as e:
-            logger.error(f"Error getting genres for book {book_id}: {e}")
+            logger.error("Error getting genres for books %s: %s", book_ids, e)
             raise
 
     @staticmethod
-    def get_books_by_genre_id(genre_id: int, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
+    def get_books_by_genre_id(genre_id: int, limit: int = 100, offset: int = 0,
+                              after: Optional[Tuple[str, int]] = None) -> List[Dict[str, Any]]:
         """
         Get all books for a specific genre
         :param genre_id: ID of the genre
         :param limit: Maximum number of books to return
-        :param offset: Offset for pagination
+        :param offset: Offset for pagination, ignored when after is given
+        :param after: (title, id) of the last book of the previous page for keyset pagination (optional)
         :return: List of dictionaries containing book details
         """
 
-        query = """
-            SELECT b.*
-            FROM books b
-            JOIN book_genres bg ON b.id = bg.book_id
-            WHERE bg.genre_id = %s
-            ORDER BY b.title
-            LIMIT %s OFFSET %s
-        """
+        if after:
+            query = """
+                SELECT b.*
+                FROM books b
+                JOIN book_genres bg ON b.id = bg.book_id
+                WHERE bg.genre_id = %s AND (b.title, b.id) > (%s, %s)
+                ORDER BY b.title, b.id
+                LIMIT %s
+            """
+            params = (genre_id, after[0], after[1], limit)
+        else:
+            query = """
+                SELECT b.*
+                FROM books b
+                JOIN book_genres bg ON b.id = bg.book_id
+                WHERE bg.genre_id = %s
+                ORDER BY b.title, b.id
+                LIMIT %s OFFSET %s
+            """
+            params = (genre_id, limit, offset)
         try:
-            results = execute_query(query, (genre_id, limit, offset), fetch=True)
-            return [dict(row) for row in results]
+            results = execute_read(query, params)
+            # RealDictCursor rows already are dicts, no copy needed
+            return results
         except Exception as e:
-            logger.error(f"Error getting books for genre {genre_id}: {e}")
+            logger.error("Error getting books for genre %s: %s", genre_id, e)
             raise
 
     @staticmethod
@@ -120,40 +226,28 @@ class BookGenreRepository:
         :return: True if relationship was created, False if it already exists
         """
 
+        # The no-op DO UPDATE makes the conflicting row come back too, xmax is 0 only on a freshly inserted tuple
+        query = """
+            INSERT INTO book_genres (book_id, genre_id)
+            VALUES (%s, %s)
+            ON CONFLICT (book_id, genre_id) DO UPDATE SET book_id = EXCLUDED.book_id
+            RETURNING id, (xmax = 0) AS inserted
+        """
         try:
             if conn:
                 # Use provided connection (transactional)
                 with conn.cursor() as cursor:
-                    # First check if relationship already exists
-                    check_query = "SELECT id FROM book_genres WHERE book_id = %s AND genre_id = %s"
-                    cursor.execute(check_query, (book_id, genre_id))
-                    existing = cursor.fetchone()
-
-                    if existing:
-                        return False  # Relationship already exists
-
-                    # Create the relationship
-                    insert_query = """
-                        INSERT INTO book_genres (book_id, genre_id)
-                        VALUES (%s, %s)
-                    """
-                    cursor.execute(insert_query, (book_id, genre_id))
-                    return cursor.rowcount > 0
+                    cursor.execute(query, (book_id, genre_id))
+                    result = cursor.fetchone()
             else:
                 # Use standalone execution
-                # First check if relationship already exists
-                check_query = "SELECT id FROM book_genres WHERE book_id = %s AND genre_id = %s"
-                existing = execute_single_query(check_query, (book_id, genre_id))
-
-                if existing:
-                    return False  # Relationship already exists
-
-                book_genre = BookGenre(book_id=book_id, genre_id=genre_id)
-                result = BookGenreRepository.create(book_genre)
-                return result is not None
+                result = execute_single_query(query, (book_id, genre_id))
+            return bool(result and result['inserted'])
         except Exception as e:
-            logger.error(f"Error adding genre {genre_id} to book {book_id}: {e}")
+            logger.error("Error adding genre %s to book %s: %s", genre_id, book_id, e)
             raise
+        finally:
+            _invalidate_genres(book_id)
 
     @staticmethod
     def remove_genre_from_book(book_id: int, genre_id: int, conn=None) -> bool:
@@ -174,11 +268,42 @@ class BookGenreRepository:
                     return cursor.rowcount > 0
             else:
                 # Use standalone execution
-                rows_affected = execute_query(query, (book_id, genre_id))
+                rows_affected = execute_write(query, (book_id, genre_id))
                 return rows_affected > 0
         except Exception as e:
-            logger.error(f"Error removing genre {genre_id} from book {book_id}: {e}")
+            logger.error("Error removing genre %s from book %s: %s", genre_id, book_id, e)
             raise
+        finally:
+            _invalidate_genres(book_id)
+
+    @staticmethod
+    def remove_many(pairs: List[Tuple[int, int]], conn=None) -> int:
+        """
+        Remove many book-genre relationships in a single statement - supports both standalone and transactional usage
+        :param pairs: List of (book_id, genre_id) tuples
+        :param conn: Optional database connection for transactional usage
+        :return: Number of relationships removed
+        """
+
+        if not pairs:
+            return 0
+
+        query = "DELETE FROM book_genres WHERE (book_id, genre_id) IN %s"
+        params = (tuple(tuple(pair) for pair in pairs),)
+        try:
+            if conn:
+                # Use provided connection (transactional)
+                with conn.cursor() as cursor:
+                    cursor.execute(query, params)
+                    return cursor.rowcount
+            else:
+                # Use standalone execution
+                return execute_write(query, params)
+        except Exception as e:
+            logger.error("Error bulk removing book-genre relationships: %s", e)
+            raise
+        finally:
+            _invalidate_genres(*{book_id for book_id, _ in pairs})
 
     @staticmethod
     def remove_all_genres_from_book(book_id: int, conn=None) -> bool:
@@ -195,14 +320,16 @@ class BookGenreRepository:
                 # Use provided connection (transactional)
                 with conn.cursor() as cursor:
                     cursor.execute(query, (book_id,))
-                    return cursor.rowcount >= 0  # Could be 0 if book had no genres
+                    return cursor.rowcount > 0
             else:
                 # Use standalone execution
-                rows_affected = execute_query(query, (book_id,))
-                return rows_affected >= 0  # Could be 0 if book had no genres
+                rows_affected = execute_write(query, (book_id,))
+                return rows_affected > 0
         except Exception as e:
-            logger.error(f"Error removing all genres from book {book_id}: {e}")
+            logger.error("Error removing all genres from book %s: %s", book_id, e)
             raise
+        finally:
+            _invalidate_genres(book_id)
 
     @staticmethod
     def delete_all_books_for_genre(genre_id: int) -> bool:
@@ -213,11 +340,13 @@ class BookGenreRepository:
         """
         query = "DELETE FROM book_genres WHERE genre_id = %s"
         try:
-            rows_affected = execute_query(query, (genre_id,))
-            return rows_affected >= 0
+            rows_affected = execute_write(query, (genre_id,))
+            return rows_affected > 0
         except Exception as e:
-            logger.error(f"Error removing all books from genre {genre_id}: {e}")
+            logger.error("Error removing all books from genre %s: %s", genre_id, e)
             raise
+        finally:
+            BookGenreRepository.clear_genres_cache()
 
     @staticmethod
     def get_all_relationships(limit: int = 100, offset: int = 0) -> List[BookGenre]:
@@ -234,10 +363,46 @@ class BookGenreRepository:
             LIMIT %s OFFSET %s
         """
         try:
-            results = execute_query(query, (limit, offset), fetch=True)
-            return [BookGenre.from_dict(dict(row)) for row in results]
+            results = execute_read(query, (limit, offset), dict_rows=False)
+            return [BookGenre.from_row(row) for row in results]
+        except Exception as e:
+            logger.error("Error getting all book-genre relationships: %s", e)
+            raise
+
+    @staticmethod
+    def iter_all_relationships() -> Iterator[BookGenre]:
+        """
+        Stream every book-genre relationship through a server-side cursor without loading them all in memory
+        :return: Generator of BookGenre objects
+        """
+
+        query = "SELECT id, book_id, genre_id FROM book_genres ORDER BY id"
+        try:
+            for row in stream_query(query, chunk_size=1000, dict_rows=False):
+                yield BookGenre.from_row(row)
+        except Exception as e:
+            logger.error("Error streaming book-genre relationships: %s", e)
+            raise
+
+    @staticmethod
+    def iter_books_by_genre_id(genre_id: int) -> Iterator[Dict[str, Any]]:
+        """
+        Stream every book of a specific genre through a server-side cursor
+        :param genre_id: ID of the genre
+        :return: Generator of dictionaries containing book details
+        """
+
+        query = """
+            SELECT b.*
+            FROM books b
+            JOIN book_genres bg ON b.id = bg.book_id
+            WHERE bg.genre_id = %s
+            ORDER BY b.title
+        """
+        try:
+            yield from stream_query(query, (genre_id,), chunk_size=1000)
         except Exception as e:
-            logger.error(f"Error getting all book-genre relationships: {e}")
+            logger.error("Error streaming books for genre %s: %s", genre_id, e)
             raise
 
     @staticmethod
@@ -250,10 +415,10 @@ class BookGenreRepository:
 
         query = "SELECT COUNT(*) as count FROM book_genres WHERE genre_id = %s"
         try:
-            result = execute_single_query(query, (genre_id,))
+            result = execute_read(query, (genre_id,), one=True, prepared='count_books_in_genre')
             return result['count'] if result else 0
         except Exception as e:
-            logger.error(f"Error counting books in genre {genre_id}: {e}")
+            logger.error("Error counting books in genre %s: %s", genre_id, e)
             raise
 
     @staticmethod
@@ -266,10 +431,40 @@ class BookGenreRepository:
 
         query = "SELECT COUNT(*) as count FROM book_genres WHERE book_id = %s"
         try:
-            result = execute_single_query(query, (book_id,))
+            result = execute_read(query, (book_id,), one=True, prepared='count_genres_for_book')
             return result['count'] if result else 0
         except Exception as e:
-            logger.error(f"Error counting genres for book {book_id}: {e}")
+            logger.error("Error counting genres for book %s: %s", book_id, e)
+            raise
+
+    @staticmethod
+    def book_has_any_genre(book_id: int) -> bool:
+        """
+        Check if a book has at least one genre, stopping at the first match
+        :param book_id: ID of the book
+        :return: True if the book has any genre, False otherwise
+        """
+
+        query = "SELECT EXISTS(SELECT 1 FROM book_genres WHERE book_id = %s) AS found"
+        try:
+            return execute_read(query, (book_id,), one=True, prepared='book_has_any_genre')['found']
+        except Exception as e:
+            logger.error("Error checking genres for book %s: %s", book_id, e)
+            raise
+
+    @staticmethod
+    def genre_has_any_book(genre_id: int) -> bool:
+        """
+        Check if a genre is assigned to at least one book, stopping at the first match
+        :param genre_id: ID of the genre
+        :return: True if the genre has any book, False otherwise
+        """
+
+        query = "SELECT EXISTS(SELECT 1 FROM book_genres WHERE genre_id = %s) AS found"
+        try:
+            return execute_read(query, (genre_id,), one=True, prepared='genre_has_any_book')['found']
+        except Exception as e:
+            logger.error("Error checking books for genre %s: %s", genre_id, e)
             raise
 
     @staticmethod
@@ -282,39 +477,60 @@ class BookGenreRepository:
         :return: True if genres were updated successfully, False if no changes were made
         """
 
+        # Drop the genres that are no longer assigned and insert the missing ones in a single statement,
+        # the two parts touch disjoint rows so they can share one snapshot
+        query = """
+            WITH removed AS (
+                DELETE FROM book_genres
+                WHERE book_id = %s AND genre_id <> ALL(%s::integer[])
+            )
+            INSERT INTO book_genres (book_id, genre_id)
+            SELECT DISTINCT %s, unnest(%s::integer[])
+            ON CONFLICT (book_id, genre_id) DO NOTHING
+        """
+        genre_ids = list(genre_ids)
+        params = (book_id, genre_ids, book_id, genre_ids)
         try:
             if conn:
                 # Use provided connection (transactional)
                 with conn.cursor() as cursor:
-                    # Remove all existing genres for this book
-                    cursor.execute("DELETE FROM book_genres WHERE book_id = %s", (book_id,))
-
-                    # Add new genres
-                    for genre_id in genre_ids:
-                        cursor.execute(
-                            "INSERT INTO book_genres (book_id, genre_id) VALUES (%s, %s)",
-                            (book_id, genre_id)
-                        )
+                    cursor.execute(query, params)
                     return True
             else:
-                # Use standalone execution with manual transaction
-                with get_db_connection() as standalone_conn:
-                    with standalone_conn.cursor() as cursor:
-                        # Remove all existing genres for this book
-                        cursor.execute("DELETE FROM book_genres WHERE book_id = %s", (book_id,))
-
-                        # Add new genres
-                        for genre_id in genre_ids:
-                            cursor.execute(
-                                "INSERT INTO book_genres (book_id, genre_id) VALUES (%s, %s)",
-                                (book_id, genre_id)
-                            )
-                        # Commit happens automatically when exiting context manager
-                        return True
+                # Use standalone execution
+                execute_write(query, params)
+                return True
         except Exception as e:
-            # Rollback happens automatically on exception
-            logger.error(f"Error updating genres for book {book_id}: {e}")
+            logger.error("Error updating genres for book %s: %s", book_id, e)
             raise
+        finally:
+            _invalidate_genres(book_id)
+
+    @staticmethod
+    def cache_genres(book_id: int, genres: List[Dict[str, Any]]) -> None:
+        """
+        Seed the genre cache with genres read together with the book by another query
+        :param book_id: ID of the book
+        :param genres: List of dictionaries containing genre details, ordered by name
+        """
+        _genres_cache.set(book_id, genres)
+
+    @staticmethod
+    def invalidate_genres(*book_ids: int) -> None:
+        """
+        Drop the cached genre lists of the given books
+        Writes made through a caller's connection call this again once the transaction has committed,
+        so a read racing the commit cannot re-cache the old links
+        :param book_ids: IDs of the books whose genre links changed
+        """
+        _invalidate_genres(*book_ids)
+
+    @staticmethod
+    def clear_genres_cache() -> None:
+        """
+        Drop every cached genre list, used when genres themselves are renamed or deleted
+        """
+        _genres_cache.clear()
 
     @staticmethod
     def exists(book_id: int, genre_id: int) -> bool:
@@ -325,12 +541,11 @@ class BookGenreRepository:
         :return: True if relationship exists, False otherwise
         """
 
-        query = "SELECT 1 FROM book_genres WHERE book_id = %s AND genre_id = %s"
+        query = "SELECT EXISTS(SELECT 1 FROM book_genres WHERE book_id = %s AND genre_id = %s) AS found"
         try:
-            result = execute_single_query(query, (book_id, genre_id))
-            return result is not None
+            return execute_read(query, (book_id, genre_id), one=True, prepared='book_genre_exists')['found']
         except Exception as e:
-            logger.error(f"Error checking if book-genre relationship exists: {e}")
+            logger.error("Error checking if book-genre relationship exists: %s", e)
             raise
 
     # Legacy method name for backward compatibility
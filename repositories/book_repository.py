@@ -1,11 +1,50 @@
-from typing import List, Optional
-from models.database import execute_query, execute_single_query
+import re
+from typing import Iterator, List, Optional, Tuple
+from models.database import execute_read, execute_write, execute_single_query, execute_paged, stream_query
 from models.book_model import Book
 from repositories.book_genre_repository import BookGenreRepository
+from utils.ttl_cache import TTLCache, MISSING
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Book rows (without genres) by id, and ids by ('isbn', isbn), for detail lookups. Genres are read from the
+# BookGenreRepository cache on a hit, so genre link changes never leave a cached book stale
+BOOK_CACHE_TTL = 60
+_book_cache = TTLCache(maxsize=10000, ttl=BOOK_CACHE_TTL)
+
+# Select-list column aggregating a book's genres (ordered by name) as a JSON array, for queries aliasing books as b
+_GENRES_JSON = """
+    COALESCE((
+        SELECT json_agg(json_build_object('id', g_agg.id, 'name', g_agg.name, 'description', g_agg.description)
+                        ORDER BY g_agg.name)
+        FROM book_genres bg_agg
+        JOIN genres g_agg ON g_agg.id = bg_agg.genre_id
+        WHERE bg_agg.book_id = b.id
+    ), '[]') AS genres
+"""
+
+# Search terms shaped like an ISBN-10/13 are matched on the isbn column alone, through its indexes
+_ISBN_RE = re.compile(r'^(?:\d{9}[\dX]|\d{13})$')
+
+
+def _search_condition(search_term: str) -> Tuple[str, tuple]:
+    """
+    Build the WHERE condition matching a search term against books aliased as b
+    :param search_term: Term to search in title, author, or ISBN
+    :return: Tuple of (SQL condition, its parameters)
+    """
+    if not search_term.strip():
+        # A blank term matches every book, skip evaluating LIKE '%%' on each row
+        return "TRUE", ()
+    isbn = search_term.replace('-', '').upper()
+    if _ISBN_RE.match(isbn):
+        # ISBNs are stored as entered, so the term is also matched as typed (hyphens kept), and ten digits
+        # may be the start of an ISBN-13
+        return "(b.isbn IN (%s, %s) OR b.isbn LIKE %s)", (isbn, search_term.strip(), f"{isbn}%")
+    search_pattern = f"%{search_term}%"
+    return "(b.title ILIKE %s OR b.author ILIKE %s OR b.isbn LIKE %s)", (search_pattern,) * 3
+
 
 class BookRepository:
     """
@@ -13,6 +52,139 @@ class BookRepository:
     This class provides methods to create, read, update, delete, and search books.
     """
 
+    # Queries without per-call parts are assembled once, when the class is defined
+    _Q_GET_BY_ID = f"""
+        SELECT b.id, b.isbn, b.title, b.author, b.publication_year, b.pages,
+               b.language, b.description, b.copies_total, b.copies_available,
+               {_GENRES_JSON}
+        FROM books b
+        WHERE b.id = %s
+    """
+    _Q_GET_BY_ISBN = f"""
+        SELECT b.id, b.isbn, b.title, b.author, b.publication_year, b.pages,
+               b.language, b.description, b.copies_total, b.copies_available,
+               {_GENRES_JSON}
+        FROM books b
+        WHERE b.isbn = %s
+    """
+    _Q_GET_MANY_BY_IDS = f"""
+        SELECT b.id, b.isbn, b.title, b.author, b.publication_year, b.pages,
+               b.language, b.description, b.copies_total, b.copies_available,
+               {_GENRES_JSON}
+        FROM books b
+        WHERE b.id = ANY(%s)
+    """
+    _Q_GET_MANY_BY_ISBNS = f"""
+        SELECT b.id, b.isbn, b.title, b.author, b.publication_year, b.pages,
+               b.language, b.description, b.copies_total, b.copies_available,
+               {_GENRES_JSON}
+        FROM books b
+        WHERE b.isbn = ANY(%s)
+    """
+    _Q_GET_ALL_AFTER = f"""
+        SELECT b.id, b.isbn, b.title, b.author, b.publication_year, b.pages,
+               b.language, b.description, b.copies_total, b.copies_available,
+               {_GENRES_JSON}
+        FROM books b
+        WHERE (b.title, b.id) > (%s, %s)
+        ORDER BY b.title, b.id
+        LIMIT %s
+    """
+    _Q_GET_ALL = f"""
+        SELECT b.id, b.isbn, b.title, b.author, b.publication_year, b.pages,
+               b.language, b.description, b.copies_total, b.copies_available,
+               {_GENRES_JSON}
+        FROM books b
+        ORDER BY b.title, b.id
+        LIMIT %s OFFSET %s
+    """
+    _Q_GET_ALL_WITH_TOTAL = f"""
+        SELECT b.id, b.isbn, b.title, b.author, b.publication_year, b.pages,
+               b.language, b.description, b.copies_total, b.copies_available,
+               {_GENRES_JSON},
+               COUNT(*) OVER () AS total
+        FROM books b
+        ORDER BY b.title, b.id
+        LIMIT %s OFFSET %s
+    """
+    _Q_GET_PAGE_AFTER = f"""
+        SELECT b.id, b.isbn, b.title, b.author, b.publication_year, b.pages,
+               b.language, b.description, b.copies_total, b.copies_available,
+               {_GENRES_JSON}
+        FROM books b
+    """
+    _Q_ITER_ALL = f"""
+        SELECT b.id, b.isbn, b.title, b.author, b.publication_year, b.pages,
+               b.language, b.description, b.copies_total, b.copies_available,
+               {_GENRES_JSON}
+        FROM books b
+        ORDER BY b.id
+    """
+    _Q_GET_BY_GENRE_AFTER = f"""
+        SELECT b.id, b.isbn, b.title, b.author, b.publication_year,
+               b.pages, b.language, b.description, b.copies_total, b.copies_available,
+               {_GENRES_JSON}
+        FROM books b
+        JOIN book_genres bg ON b.id = bg.book_id
+        WHERE bg.genre_id = %s AND (b.title, b.id) > (%s, %s)
+        ORDER BY b.title, b.id
+        LIMIT %s
+    """
+    _Q_GET_BY_GENRE = f"""
+        SELECT b.id, b.isbn, b.title, b.author, b.publication_year,
+               b.pages, b.language, b.description, b.copies_total, b.copies_available,
+               {_GENRES_JSON}
+        FROM books b
+        JOIN book_genres bg ON b.id = bg.book_id
+        WHERE bg.genre_id = %s
+        ORDER BY b.title, b.id
+        LIMIT %s OFFSET %s
+    """
+    _Q_GET_BY_GENRE_WITH_TOTAL = f"""
+        SELECT b.id, b.isbn, b.title, b.author, b.publication_year,
+               b.pages, b.language, b.description, b.copies_total, b.copies_available,
+               {_GENRES_JSON},
+               COUNT(*) OVER () AS total
+        FROM books b
+        JOIN book_genres bg ON b.id = bg.book_id
+        WHERE bg.genre_id = %s
+        ORDER BY b.title, b.id
+        LIMIT %s OFFSET %s
+    """
+    _Q_UPDATE = f"""
+        WITH updated AS (
+            UPDATE books 
+            SET isbn = %s, title = %s, author = %s, publication_year = %s,
+                pages = %s, language = %s, description = %s, copies_total = %s, 
+                copies_available = %s
+            WHERE id = %s
+            RETURNING id, isbn, title, author, publication_year, pages, 
+                     language, description, copies_total, copies_available
+        )
+        SELECT b.id, b.isbn, b.title, b.author, b.publication_year, b.pages,
+               b.language, b.description, b.copies_total, b.copies_available,
+               {_GENRES_JSON}
+        FROM updated b
+    """
+    _Q_GET_AVAILABLE_AFTER = f"""
+        SELECT b.id, b.isbn, b.title, b.author, b.publication_year, b.pages,
+               b.language, b.description, b.copies_total, b.copies_available,
+               {_GENRES_JSON}
+        FROM books b
+        WHERE b.copies_available > 0 AND (b.title, b.id) > (%s, %s)
+        ORDER BY b.title, b.id
+        LIMIT %s
+    """
+    _Q_GET_AVAILABLE = f"""
+        SELECT b.id, b.isbn, b.title, b.author, b.publication_year, b.pages,
+               b.language, b.description, b.copies_total, b.copies_available,
+               {_GENRES_JSON}
+        FROM books b
+        WHERE b.copies_available > 0
+        ORDER BY b.title, b.id
+        LIMIT %s OFFSET %s
+    """
+
     @staticmethod
     def create(book: Book, conn=None) -> Optional[Book]:
         """Create a new book - supports both standalone and transactional usage
@@ -39,7 +211,7 @@ class BookRepository:
                     ))
                     result = cursor.fetchone()
                     if result:
-                        created_book = Book.from_dict(dict(result))
+                        created_book = Book.from_dict(result)
                         return created_book
                     return None
             else:
@@ -50,9 +222,9 @@ class BookRepository:
                     book.copies_available
                 ))
                 if result:
-                    created_book = Book.from_dict(dict(result))
-                    # Get genres for this book (will be empty for new book)
-                    created_book.genres = BookGenreRepository.get_genres_by_book_id(created_book.id)
+                    created_book = Book.from_dict(result)
+                    # A book that was just inserted cannot have genres yet, no need to query for them
+                    created_book.genres = []
                     return created_book
                 return None
         except Exception as e:
@@ -60,31 +232,61 @@ class BookRepository:
             raise
 
     @staticmethod
-    def get_by_id(book_id: int) -> Optional[Book]:
+    def get_by_id(book_id: int, use_cache: bool = True) -> Optional[Book]:
         """
         Get book by ID with genres
         :param book_id: ID of the book to retrieve
+        :param use_cache: Whether the book may be served from the in-process cache, pass False when the result
+                          feeds a write, since loans handled by other workers do not invalidate this cache
         :return: Book object with genres, or None if not found
         """
 
-        query = """
-            SELECT id, isbn, title, author, publication_year, pages, 
-                   language, description, copies_total, copies_available
-            FROM books 
-            WHERE id = %s
-        """
+        if use_cache:
+            cached = BookRepository._from_cache(book_id)
+            if cached is not None:
+                return cached
+
+        query = BookRepository._Q_GET_BY_ID
         try:
-            result = execute_single_query(query, (book_id,))
+            result = execute_read(query, (book_id,), one=True, prepared='book_by_id', dict_rows=False)
             if result:
-                book = Book.from_dict(dict(result))
-                # Get genres for this book
-                book.genres = BookGenreRepository.get_genres_by_book_id(book_id)
-                return book
+                BookRepository._to_cache(result)
+                return Book.from_row(result)
             return None
         except Exception as e:
             logger.error(f"Error getting book by id {book_id}: {e}")
             raise
 
+    @staticmethod
+    def _from_cache(book_id: int) -> Optional[Book]:
+        """
+        Build a book from the cached row and the cached (or freshly read) genres
+        :param book_id: ID of the book
+        :return: Book object with genres, or None if the row is not cached
+        """
+        row = _book_cache.get(book_id)
+        if row is MISSING:
+            return None
+        return Book.from_row(row + (BookGenreRepository.get_genres_by_book_id(book_id),))
+
+    @staticmethod
+    def _to_cache(row: tuple) -> None:
+        """
+        Cache a book row read with its genres, seeding the genre cache with them
+        :param row: Book columns in constructor order followed by the genres
+        """
+        _book_cache.set(row[0], row[:-1])
+        _book_cache.set(('isbn', row[1]), row[0])
+        BookGenreRepository.cache_genres(row[0], row[-1])
+
+    @staticmethod
+    def invalidate_cache(book_id: int) -> None:
+        """
+        Drop a cached book, called by every write to its row (availability changes made by loans included)
+        :param book_id: ID of the book that changed
+        """
+        _book_cache.pop(book_id)
+
     @staticmethod
     def get_by_isbn(isbn: str) -> Optional[Book]:
         """
@@ -93,53 +295,137 @@ class BookRepository:
         :return: Book object with genres, or None if not found
         """
 
-        query = """
-            SELECT id, isbn, title, author, publication_year, pages, 
-                   language, description, copies_total, copies_available
-            FROM books 
-            WHERE isbn = %s
-        """
+        book_id = _book_cache.get(('isbn', isbn))
+        if book_id is not MISSING:
+            cached = BookRepository._from_cache(book_id)
+            # The ISBN may have changed since it was mapped to this id
+            if cached is not None and cached.isbn == isbn:
+                return cached
+
+        query = BookRepository._Q_GET_BY_ISBN
         try:
-            result = execute_single_query(query, (isbn,))
+            result = execute_read(query, (isbn,), one=True, prepared='book_by_isbn', dict_rows=False)
             if result:
-                book = Book.from_dict(dict(result))
-                # Get genres for this book
-                book.genres = BookGenreRepository.get_genres_by_book_id(book.id)
-                return book
+                BookRepository._to_cache(result)
+                return Book.from_row(result)
             return None
         except Exception as e:
             logger.error(f"Error getting book by ISBN {isbn}: {e}")
             raise
 
     @staticmethod
-    def get_all(limit: int = 50, offset: int = 0) -> List[Book]:
+    def get_many_by_ids(book_ids: List[int]) -> List[Book]:
+        """
+        Get several books by ID with genres in a single query
+        :param book_ids: IDs of the books to retrieve
+        :return: List of the Book objects found, in no particular order
+        """
+
+        if not book_ids:
+            return []
+
+        query = BookRepository._Q_GET_MANY_BY_IDS
+        try:
+            results = execute_read(query, (list(book_ids),), prepared='books_by_ids', dict_rows=False)
+            return [Book.from_row(row) for row in results]
+        except Exception as e:
+            logger.error(f"Error getting books by ids {book_ids}: {e}")
+            raise
+
+    @staticmethod
+    def get_many_by_isbns(isbns: List[str]) -> List[Book]:
+        """
+        Get several books by ISBN with genres in a single query
+        :param isbns: ISBNs of the books to retrieve
+        :return: List of the Book objects found, in no particular order
+        """
+
+        if not isbns:
+            return []
+
+        query = BookRepository._Q_GET_MANY_BY_ISBNS
+        try:
+            results = execute_read(query, (list(isbns),), prepared='books_by_isbns', dict_rows=False)
+            return [Book.from_row(row) for row in results]
+        except Exception as e:
+            logger.error(f"Error getting books by ISBNs {isbns}: {e}")
+            raise
+
+    @staticmethod
+    def get_all(limit: int = 50, offset: int = 0, after: Optional[Tuple[str, int]] = None) -> List[Book]:
         """
         Get all books with pagination and genres
         :param limit: Number of books to return
-        :param offset: Offset for pagination
+        :param offset: Offset for pagination, ignored when after is given
+        :param after: (title, id) of the last book of the previous page for keyset pagination (optional)
         :return: List of Book objects with genres
         """
 
-        query = """
-            SELECT id, isbn, title, author, publication_year, pages, 
-                   language, description, copies_total, copies_available
-            FROM books 
-            ORDER BY title 
-            LIMIT %s OFFSET %s
-        """
+        if after:
+            query = BookRepository._Q_GET_ALL_AFTER
+            params, prepared = (after[0], after[1], limit), 'books_page_after'
+        else:
+            query = BookRepository._Q_GET_ALL
+            params, prepared = (limit, offset), 'books_page'
         try:
-            results = execute_query(query, (limit, offset), fetch=True)
-            books = []
-            for row in results:
-                book = Book.from_dict(dict(row))
-                # Get genres for each book
-                book.genres = BookGenreRepository.get_genres_by_book_id(book.id)
-                books.append(book)
-            return books
+            results = execute_read(query, params, prepared=prepared, dict_rows=False)
+            return [Book.from_row(row) for row in results]
         except Exception as e:
             logger.error(f"Error getting all books: {e}")
             raise
 
+    @staticmethod
+    def get_all_with_total(limit: int = 50, offset: int = 0) -> Tuple[List[Book], int]:
+        """
+        Get a page of books with genres together with the total number of books, in a single query
+        :param limit: Number of books to return
+        :param offset: Offset for pagination
+        :return: Tuple of (list of Book objects with genres, total number of books)
+        """
+
+        query = BookRepository._Q_GET_ALL_WITH_TOTAL
+        try:
+            results = execute_read(query, (limit, offset), prepared='books_page_with_total', dict_rows=False)
+            if not results:
+                # Past the last page the window has no rows to report the total on
+                return [], BookRepository.count() if offset else 0
+            return [Book.from_row(row[:-1]) for row in results], results[0][-1]
+        except Exception as e:
+            logger.error(f"Error getting all books with total: {e}")
+            raise
+
+    @staticmethod
+    def get_page_after(after_id: Optional[int] = None, limit: int = 50) -> Tuple[List[Book], Optional[int]]:
+        """
+        Get a page of books ordered by ID using keyset pagination
+        :param after_id: ID of the last book of the previous page, None for the first page
+        :param limit: Number of books to return
+        :return: Tuple of (list of Book objects with genres, ID to request the next page with or None)
+        """
+
+        query = BookRepository._Q_GET_PAGE_AFTER
+        try:
+            results, next_id = execute_paged(query, None, 'id', last_value=after_id, limit=limit)
+            return [Book.from_dict(row) for row in results], next_id
+        except Exception as e:
+            logger.error(f"Error getting books after id {after_id}: {e}")
+            raise
+
+    @staticmethod
+    def iter_all() -> Iterator[Book]:
+        """
+        Stream every book with its genres, ordered by ID, without loading the whole table in memory
+        :return: Generator of Book objects with genres
+        """
+
+        query = BookRepository._Q_ITER_ALL
+        try:
+            for row in stream_query(query, dict_rows=False):
+                yield Book.from_row(row)
+        except Exception as e:
+            logger.error(f"Error streaming all books: {e}")
+            raise
+
     @staticmethod
     def search(search_term: str, genre_ids: List[int] = None, limit: int = 50) -> List[Book]:
         """
@@ -150,124 +436,126 @@ class BookRepository:
         :return: List of Book objects matching the search criteria
         """
 
+        if not search_term or not search_term.strip():
+            # Nothing to match on, serve the plain (index-ordered) listings instead
+            if not genre_ids:
+                return BookRepository.get_all(limit=limit)
+            if len(genre_ids) == 1:
+                return BookRepository.get_by_genre(genre_ids[0], limit=limit)
+
+        condition, condition_params = _search_condition(search_term or '')
         if genre_ids:
             # Search with genre filter
-            query = """
-                SELECT DISTINCT b.id, b.isbn, b.title, b.author, b.publication_year, 
-                       b.pages, b.language, b.description, b.copies_total, b.copies_available
+            # EXISTS keeps one row per book without DISTINCT, which json columns do not support
+            query = f"""
+                SELECT b.id, b.isbn, b.title, b.author, b.publication_year,
+                       b.pages, b.language, b.description, b.copies_total, b.copies_available,
+                       {_GENRES_JSON}
                 FROM books b
-                JOIN book_genres bg ON b.id = bg.book_id
-                WHERE (LOWER(b.title) LIKE LOWER(%s) OR LOWER(b.author) LIKE LOWER(%s) OR b.isbn LIKE %s)
-                AND bg.genre_id = ANY(%s)
-                ORDER BY b.title 
+                WHERE {condition}
+                AND EXISTS (SELECT 1 FROM book_genres bg WHERE bg.book_id = b.id AND bg.genre_id = ANY(%s))
+                ORDER BY b.title
                 LIMIT %s
             """
-            search_pattern = f"%{search_term}%"
-            params = (search_pattern, search_pattern, search_pattern, genre_ids, limit)
+            params = condition_params + (genre_ids, limit)
         else:
             # Search without genre filter
-            query = """
-                SELECT id, isbn, title, author, publication_year, pages, 
-                       language, description, copies_total, copies_available
-                FROM books 
-                WHERE LOWER(title) LIKE LOWER(%s) OR LOWER(author) LIKE LOWER(%s) OR isbn LIKE %s
-                ORDER BY title 
+            query = f"""
+                SELECT b.id, b.isbn, b.title, b.author, b.publication_year, b.pages,
+                       b.language, b.description, b.copies_total, b.copies_available,
+                       {_GENRES_JSON}
+                FROM books b
+                WHERE {condition}
+                ORDER BY b.title
                 LIMIT %s
             """
-            search_pattern = f"%{search_term}%"
-            params = (search_pattern, search_pattern, search_pattern, limit)
+            params = condition_params + (limit,)
 
         try:
-            results = execute_query(query, params, fetch=True)
-            books = []
-            for row in results:
-                book = Book.from_dict(dict(row))
-                # Get genres for each book
-                book.genres = BookGenreRepository.get_genres_by_book_id(book.id)
-                books.append(book)
-            return books
+            results = execute_read(query, params, dict_rows=False)
+            return [Book.from_row(row) for row in results]
         except Exception as e:
             logger.error(f"Error searching books: {e}")
             raise
 
     @staticmethod
-    def get_by_genre(genre_id: int, limit: int = 50, offset: int = 0) -> List[Book]:
+    def get_by_genre(genre_id: int, limit: int = 50, offset: int = 0,
+                     after: Optional[Tuple[str, int]] = None) -> List[Book]:
         """
         Get all books in a specific genre
         :param genre_id: ID of the genre to filter by
         :param limit: Number of books to return
-        :param offset: Offset for pagination
+        :param offset: Offset for pagination, ignored when after is given
+        :param after: (title, id) of the last book of the previous page for keyset pagination (optional)
         :return: List of Book objects in the specified genre
         """
 
-        query = """
-            SELECT b.id, b.isbn, b.title, b.author, b.publication_year, 
-                   b.pages, b.language, b.description, b.copies_total, b.copies_available
-            FROM books b
-            JOIN book_genres bg ON b.id = bg.book_id
-            WHERE bg.genre_id = %s
-            ORDER BY b.title 
-            LIMIT %s OFFSET %s
-        """
+        if after:
+            query = BookRepository._Q_GET_BY_GENRE_AFTER
+            params = (genre_id, after[0], after[1], limit)
+        else:
+            query = BookRepository._Q_GET_BY_GENRE
+            params = (genre_id, limit, offset)
         try:
-            results = execute_query(query, (genre_id, limit, offset), fetch=True)
-            books = []
-            for row in results:
-                book = Book.from_dict(dict(row))
-                # Get genres for each book
-                book.genres = BookGenreRepository.get_genres_by_book_id(book.id)
-                books.append(book)
-            return books
+            results = execute_read(query, params, dict_rows=False)
+            return [Book.from_row(row) for row in results]
         except Exception as e:
             logger.error(f"Error getting books by genre {genre_id}: {e}")
             raise
 
+    @staticmethod
+    def get_by_genre_with_total(genre_id: int, limit: int = 50, offset: int = 0) -> Tuple[List[Book], int]:
+        """
+        Get a page of books in a specific genre together with the number of books in it, in a single query
+        :param genre_id: ID of the genre to filter by
+        :param limit: Number of books to return
+        :param offset: Offset for pagination
+        :return: Tuple of (list of Book objects in the genre, total number of books in the genre)
+        """
+
+        query = BookRepository._Q_GET_BY_GENRE_WITH_TOTAL
+        try:
+            results = execute_read(query, (genre_id, limit, offset), prepared='books_by_genre_with_total',
+                                   dict_rows=False)
+            if not results:
+                # Past the last page the window has no rows to report the total on
+                return [], BookRepository.count(genre_id=genre_id) if offset else 0
+            return [Book.from_row(row[:-1]) for row in results], results[0][-1]
+        except Exception as e:
+            logger.error(f"Error getting books by genre {genre_id} with total: {e}")
+            raise
+
     @staticmethod
     def update(book_id: int, book: Book, conn=None) -> Optional[Book]:
         """
         Update an existing book - supports both standalone and transactional usage
         :param book_id: ID of the book to update
         :param book: Book object with updated data
-        :param conn: Optional database connection for transactional usage
+        :param conn: Optional database connection for transactional usage, the caller must call
+                     invalidate_cache once it has committed
         :return: Updated Book object with genres, or None if update failed
         """
 
-        query = """
-            UPDATE books 
-            SET isbn = %s, title = %s, author = %s, publication_year = %s,
-                pages = %s, language = %s, description = %s, copies_total = %s, 
-                copies_available = %s
-            WHERE id = %s
-            RETURNING id, isbn, title, author, publication_year, pages, 
-                     language, description, copies_total, copies_available
-        """
+        # The genres are aggregated in the same statement, reading the links as the transaction sees them
+        query = BookRepository._Q_UPDATE
+        params = (
+            book.isbn, book.title, book.author, book.publication_year,
+            book.pages, book.language, book.description, book.copies_total,
+            book.copies_available, book_id
+        )
         try:
             if conn:
                 # Use provided connection (transactional)
                 with conn.cursor() as cursor:
-                    cursor.execute(query, (
-                        book.isbn, book.title, book.author, book.publication_year,
-                        book.pages, book.language, book.description, book.copies_total,
-                        book.copies_available, book_id
-                    ))
+                    cursor.execute(query, params)
                     result = cursor.fetchone()
-                    if result:
-                        updated_book = Book.from_dict(dict(result))
-                        return updated_book
-                    return None
             else:
-                # Use standalone execution
-                result = execute_single_query(query, (
-                    book.isbn, book.title, book.author, book.publication_year,
-                    book.pages, book.language, book.description, book.copies_total,
-                    book.copies_available, book_id
-                ))
-                if result:
-                    updated_book = Book.from_dict(dict(result))
-                    # Get genres for this book
-                    updated_book.genres = BookGenreRepository.get_genres_by_book_id(book_id)
-                    return updated_book
-                return None
+                # Use standalone execution, already committed so the cached book can be dropped now
+                result = execute_single_query(query, params)
+                BookRepository.invalidate_cache(book_id)
+            if result:
+                return Book.from_dict(result)
+            return None
         except Exception as e:
             logger.error(f"Error updating book {book_id}: {e}")
             raise
@@ -282,7 +570,8 @@ class BookRepository:
 
         query = "DELETE FROM books WHERE id = %s"
         try:
-            rows_affected = execute_query(query, (book_id,))
+            rows_affected = execute_write(query, (book_id,), prepared='book_delete')
+            BookRepository.invalidate_cache(book_id)
             return rows_affected > 0
         except Exception as e:
             logger.error(f"Error deleting book {book_id}: {e}")
@@ -298,23 +587,23 @@ class BookRepository:
         """
 
         if search_term and genre_id:
-            query = """
-                SELECT COUNT(DISTINCT b.id) as count 
+            condition, condition_params = _search_condition(search_term)
+            # EXISTS is a semi-join, so books are counted once without deduplicating the join
+            query = f"""
+                SELECT COUNT(*) as count 
                 FROM books b
-                JOIN book_genres bg ON b.id = bg.book_id
-                WHERE (LOWER(b.title) LIKE LOWER(%s) OR LOWER(b.author) LIKE LOWER(%s) OR b.isbn LIKE %s)
-                AND bg.genre_id = %s
+                WHERE {condition}
+                AND EXISTS (SELECT 1 FROM book_genres bg WHERE bg.book_id = b.id AND bg.genre_id = %s)
             """
-            search_pattern = f"%{search_term}%"
-            params = (search_pattern, search_pattern, search_pattern, genre_id)
+            params = condition_params + (genre_id,)
         elif search_term:
-            query = """
+            condition, condition_params = _search_condition(search_term)
+            query = f"""
                 SELECT COUNT(*) as count 
-                FROM books 
-                WHERE LOWER(title) LIKE LOWER(%s) OR LOWER(author) LIKE LOWER(%s) OR isbn LIKE %s
+                FROM books b
+                WHERE {condition}
             """
-            search_pattern = f"%{search_term}%"
-            params = (search_pattern, search_pattern, search_pattern)
+            params = condition_params
         elif genre_id:
             query = """
                 SELECT COUNT(*) as count 
@@ -328,7 +617,7 @@ class BookRepository:
             params = None
 
         try:
-            result = execute_single_query(query, params)
+            result = execute_read(query, params, one=True)
             return result['count'] if result else 0
         except Exception as e:
             logger.error(f"Error counting books: {e}")
@@ -344,38 +633,32 @@ class BookRepository:
         """
         query = "UPDATE books SET copies_available = %s WHERE id = %s"
         try:
-            rows_affected = execute_query(query, (copies_available, book_id))
+            rows_affected = execute_write(query, (copies_available, book_id), prepared='book_update_availability')
+            BookRepository.invalidate_cache(book_id)
             return rows_affected > 0
         except Exception as e:
             logger.error(f"Error updating availability for book {book_id}: {e}")
             raise
 
     @staticmethod
-    def get_available_books(limit: int = 50, offset: int = 0) -> List[Book]:
+    def get_available_books(limit: int = 50, offset: int = 0, after: Optional[Tuple[str, int]] = None) -> List[Book]:
         """
         Get all available books (copies_available > 0)
         :param limit: Number of books to return
-        :param offset: Offset for pagination
+        :param offset: Offset for pagination, ignored when after is given
+        :param after: (title, id) of the last book of the previous page for keyset pagination (optional)
         :return: List of available Book objects with genres
         """
 
-        query = """
-            SELECT id, isbn, title, author, publication_year, pages, 
-                   language, description, copies_total, copies_available
-            FROM books 
-            WHERE copies_available > 0
-            ORDER BY title 
-            LIMIT %s OFFSET %s
-        """
+        if after:
+            query = BookRepository._Q_GET_AVAILABLE_AFTER
+            params = (after[0], after[1], limit)
+        else:
+            query = BookRepository._Q_GET_AVAILABLE
+            params = (limit, offset)
         try:
-            results = execute_query(query, (limit, offset), fetch=True)
-            books = []
-            for row in results:
-                book = Book.from_dict(dict(row))
-                # Get genres for each book
-                book.genres = BookGenreRepository.get_genres_by_book_id(book.id)
-                books.append(book)
-            return books
+            results = execute_read(query, params, dict_rows=False)
+            return [Book.from_row(row) for row in results]
         except Exception as e:
             logger.error(f"Error getting available books: {e}")
             raise
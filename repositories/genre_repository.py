@@ -1,11 +1,18 @@
 import logging
 from typing import List, Optional
 
-from models.database import execute_query, execute_single_query
+from models.database import execute_read, execute_write, execute_single_query
 from models.genre_model import Genre
+from repositories.book_genre_repository import BookGenreRepository
+from utils.ttl_cache import TTLCache, MISSING
 
 logger = logging.getLogger(__name__)
 
+# Genres change rarely but are looked up on most book requests, found genres and the count are kept
+# for GENRE_CACHE_TTL seconds and dropped on every genre write made through this process
+GENRE_CACHE_TTL = 300
+_genre_cache = TTLCache(maxsize=1024, ttl=GENRE_CACHE_TTL)
+
 
 class GenreRepository:
     """
@@ -29,7 +36,8 @@ class GenreRepository:
         try:
             result = execute_single_query(query, (genre.name, genre.description))
             if result:
-                return Genre.from_dict(dict(result))
+                GenreRepository.invalidate_cache()
+                return Genre.from_dict(result)
             return None
         except Exception as e:
             logger.error(f"Error creating genre: {e}")
@@ -43,16 +51,41 @@ class GenreRepository:
         :return: Genre object or None if not found
         """
 
+        cached = _genre_cache.get(('id', genre_id))
+        if cached is not MISSING:
+            return cached
+
         query = "SELECT id, name, description FROM genres WHERE id = %s"
         try:
-            result = execute_single_query(query, (genre_id,))
+            result = execute_read(query, (genre_id,), one=True, prepared='genre_by_id')
             if result:
-                return Genre.from_dict(dict(result))
+                genre = Genre.from_dict(result)
+                _genre_cache.set(('id', genre_id), genre)
+                return genre
             return None
         except Exception as e:
             logger.error(f"Error getting genre by id {genre_id}: {e}")
             raise
 
+    @staticmethod
+    def get_by_ids(genre_ids: List[int]) -> List[Genre]:
+        """
+        Get several genres by ID in a single query
+        :param genre_ids: IDs of the genres to retrieve
+        :return: List of the Genre objects found, in no particular order
+        """
+
+        if not genre_ids:
+            return []
+
+        query = "SELECT id, name, description FROM genres WHERE id = ANY(%s)"
+        try:
+            results = execute_read(query, (list(genre_ids),), prepared='genres_by_ids', dict_rows=False)
+            return [Genre.from_row(row) for row in results]
+        except Exception as e:
+            logger.error(f"Error getting genres by ids {genre_ids}: {e}")
+            raise
+
     @staticmethod
     def get_by_name(name: str) -> Optional[Genre]:
         """
@@ -61,11 +94,19 @@ class GenreRepository:
         :return: Genre object or None if not found
         """
 
-        query = "SELECT id, name, description FROM genres WHERE LOWER(name) = LOWER(%s)"
+        # The name is lowercased once here instead of by the server on every comparison
+        name_key = ('name', name.lower())
+        cached = _genre_cache.get(name_key)
+        if cached is not MISSING:
+            return cached
+
+        query = "SELECT id, name, description FROM genres WHERE LOWER(name) = %s"
         try:
-            result = execute_single_query(query, (name,))
+            result = execute_read(query, (name_key[1],), one=True)
             if result:
-                return Genre.from_dict(dict(result))
+                genre = Genre.from_dict(result)
+                _genre_cache.set(name_key, genre)
+                return genre
             return None
         except Exception as e:
             logger.error(f"Error getting genre by name {name}: {e}")
@@ -87,8 +128,8 @@ class GenreRepository:
             LIMIT %s OFFSET %s
         """
         try:
-            results = execute_query(query, (limit, offset), fetch=True)
-            return [Genre.from_dict(dict(row)) for row in results]
+            results = execute_read(query, (limit, offset), prepared='genres_page', dict_rows=False)
+            return [Genre.from_row(row) for row in results]
         except Exception as e:
             logger.error(f"Error getting all genres: {e}")
             raise
@@ -111,7 +152,8 @@ class GenreRepository:
         try:
             result = execute_single_query(query, (genre.name, genre.description, genre_id))
             if result:
-                return Genre.from_dict(dict(result))
+                GenreRepository.invalidate_cache()
+                return Genre.from_dict(result)
             return None
         except Exception as e:
             logger.error(f"Error updating genre {genre_id}: {e}")
@@ -127,12 +169,23 @@ class GenreRepository:
 
         query = "DELETE FROM genres WHERE id = %s"
         try:
-            rows_affected = execute_query(query, (genre_id,))
-            return rows_affected > 0
+            rows_affected = execute_write(query, (genre_id,))
+            if rows_affected > 0:
+                GenreRepository.invalidate_cache()
+                return True
+            return False
         except Exception as e:
             logger.error(f"Error deleting genre {genre_id}: {e}")
             raise
 
+    @staticmethod
+    def invalidate_cache() -> None:
+        """
+        Drop every cached genre lookup, along with the cached genre lists of books since they embed genre names
+        """
+        _genre_cache.clear()
+        BookGenreRepository.clear_genres_cache()
+
     @staticmethod
     def count() -> int:
         """
@@ -140,10 +193,16 @@ class GenreRepository:
         :return: Total number of genres
         """
 
+        cached = _genre_cache.get('count')
+        if cached is not MISSING:
+            return cached
+
         query = "SELECT COUNT(*) as count FROM genres"
         try:
-            result = execute_single_query(query)
-            return result['count'] if result else 0
+            result = execute_read(query, one=True)
+            count = result['count'] if result else 0
+            _genre_cache.set('count', count)
+            return count
         except Exception as e:
             logger.error(f"Error counting genres: {e}")
             raise
@@ -160,14 +219,14 @@ class GenreRepository:
         query = """
             SELECT id, name, description 
             FROM genres 
-            WHERE LOWER(name) LIKE LOWER(%s) OR LOWER(description) LIKE LOWER(%s)
+            WHERE name ILIKE %s OR description ILIKE %s
             ORDER BY name 
             LIMIT %s
         """
         search_pattern = f"%{search_term}%"
         try:
-            results = execute_query(query, (search_pattern, search_pattern, limit), fetch=True)
-            return [Genre.from_dict(dict(row)) for row in results]
+            results = execute_read(query, (search_pattern, search_pattern, limit), dict_rows=False)
+            return [Genre.from_row(row) for row in results]
         except Exception as e:
             logger.error(f"Error searching genres: {e}")
             raise
\ No newline at end of file
@@ -1,12 +1,19 @@
 import logging
-from typing import List, Optional
+from typing import Iterator, List, Optional, Tuple
 from datetime import datetime
 
-from models.database import execute_query, execute_single_query
+from models.database import execute_read, execute_write, execute_single_query, stream_query
 from models.loan_model import Loan
+from repositories.book_repository import BookRepository
+from utils.ttl_cache import TTLCache, MISSING
 
 logger = logging.getLogger(__name__)
 
+# Loan rows by id for point lookups. Rows are cached rather than Loan objects, since callers mutate loans
+# (e.g. calculate_fine); the short TTL bounds staleness from writes made by other processes
+LOAN_CACHE_TTL = 10
+_loan_cache = TTLCache(maxsize=4096, ttl=LOAN_CACHE_TTL)
+
 
 class LoanRepository:
     """
@@ -38,9 +45,10 @@ class LoanRepository:
                 RETURNING id, user_id, book_id, loan_date, due_date, returned_date, fine_amount
             ),
             book_update AS (
+                -- Reuses the row book_check already found and locked instead of re-probing books
                 UPDATE books 
                 SET copies_available = copies_available - 1
-                WHERE id = %s AND copies_available > 0
+                WHERE id = (SELECT id FROM book_check)
                 RETURNING copies_available
             )
             SELECT l.id, l.user_id, l.book_id, l.loan_date, l.due_date, l.returned_date, l.fine_amount, b.copies_available
@@ -49,42 +57,56 @@ class LoanRepository:
         try:
             result = execute_single_query(query, (
                 loan.book_id,  # book_check
-                loan.user_id, loan.book_id, loan.loan_date, loan.due_date, loan.fine_amount,  # loan_insert
-                loan.book_id   # book_update
-            ))
+                loan.user_id, loan.book_id, loan.loan_date, loan.due_date, loan.fine_amount  # loan_insert
+            ), prepared=True, dict_rows=False)
             if result:
-                # Log the new availability for debugging
-                loan_data = dict(result)
-                copies_available = loan_data.pop('copies_available', None)
-                logger.info(f"Loan created successfully. Book {loan.book_id} now has {copies_available} copies available")
-                return Loan.from_dict(loan_data)
+                BookRepository.invalidate_cache(loan.book_id)
+                # Log the new availability for debugging, the trailing copies_available column is not part of Loan
+                logger.info(f"Loan created successfully. Book {loan.book_id} now has {result[-1]} copies available")
+                return Loan.from_row(result[:-1])
             return None  # No available copies or other error
         except Exception as e:
             logger.error(f"Error creating loan atomically: {e}")
             raise
 
     @staticmethod
-    def get_by_id(loan_id: int) -> Optional[Loan]:
+    def get_by_id(loan_id: int, use_cache: bool = True) -> Optional[Loan]:
         """
         Get loan by ID
         :param loan_id:  of the loan to retrieve
+        :param use_cache: Whether the loan may be served from the in-process cache, pass False when the result
+                          decides a write, since changes made by other workers do not invalidate this cache
         :return: Loan object or None if not found
         """
 
+        if use_cache:
+            cached = _loan_cache.get(loan_id)
+            if cached is not MISSING:
+                return Loan.from_row(cached)
+
         query = """
             SELECT id, user_id, book_id, loan_date, due_date, returned_date, fine_amount
             FROM loans 
             WHERE id = %s
         """
         try:
-            result = execute_single_query(query, (loan_id,))
+            result = execute_read(query, (loan_id,), one=True, prepared=True, dict_rows=False)
             if result:
-                return Loan.from_dict(dict(result))
+                _loan_cache.set(loan_id, result)
+                return Loan.from_row(result)
             return None
         except Exception as e:
             logger.error(f"Error getting loan by id {loan_id}: {e}")
             raise
 
+    @staticmethod
+    def invalidate_cache(loan_id: int) -> None:
+        """
+        Drop a cached loan, called by every write to its row
+        :param loan_id: ID of the loan that changed
+        """
+        _loan_cache.pop(loan_id)
+
     @staticmethod
     def get_all(limit: int = 100, offset: int = 0, status: str = None) -> List[Loan]:
         """
@@ -110,12 +132,47 @@ class LoanRepository:
         query = base_query + " ORDER BY loan_date DESC LIMIT %s OFFSET %s"
 
         try:
-            results = execute_query(query, (limit, offset), fetch=True)
-            return [Loan.from_dict(dict(row)) for row in results]
+            results = execute_read(query, (limit, offset), dict_rows=False)
+            return [Loan.from_row(row) for row in results]
         except Exception as e:
             logger.error(f"Error getting all loans: {e}")
             raise
 
+    @staticmethod
+    def get_all_with_total(limit: int = 100, offset: int = 0, status: str = None) -> Tuple[List[Loan], int]:
+        """
+        Get a page of loans with optional status filter together with the number of matching loans, in a single query
+        :param limit: Number of loans to return
+        :param offset: Offset for pagination
+        :param status: Filter by loan status ('active', 'returned', 'overdue')
+        :return: Tuple of (list of Loan objects, total number of loans matching the status)
+        """
+
+        base_query = """
+            SELECT id, user_id, book_id, loan_date, due_date, returned_date, fine_amount,
+                   COUNT(*) OVER () AS total
+            FROM loans
+        """
+
+        if status == 'active':
+            base_query += " WHERE returned_date IS NULL"
+        elif status == 'returned':
+            base_query += " WHERE returned_date IS NOT NULL"
+        elif status == 'overdue':
+            base_query += " WHERE returned_date IS NULL AND due_date < NOW()"
+
+        query = base_query + " ORDER BY loan_date DESC LIMIT %s OFFSET %s"
+
+        try:
+            results = execute_read(query, (limit, offset), prepared=True, dict_rows=False)
+            if not results:
+                # Past the last page the window has no rows to report the total on
+                return [], LoanRepository.count(status=status) if offset else 0
+            return [Loan.from_row(row[:-1]) for row in results], results[0][-1]
+        except Exception as e:
+            logger.error(f"Error getting all loans with total: {e}")
+            raise
+
     @staticmethod
     def get_by_user_id(user_id: int, limit: int = 100, offset: int = 0) -> List[Loan]:
         """
@@ -134,12 +191,40 @@ class LoanRepository:
             LIMIT %s OFFSET %s
         """
         try:
-            results = execute_query(query, (user_id, limit, offset), fetch=True)
-            return [Loan.from_dict(dict(row)) for row in results]
+            results = execute_read(query, (user_id, limit, offset), prepared=True, dict_rows=False)
+            return [Loan.from_row(row) for row in results]
         except Exception as e:
             logger.error(f"Error getting loans for user {user_id}: {e}")
             raise
 
+    @staticmethod
+    def get_by_user_id_with_total(user_id: int, limit: int = 100, offset: int = 0) -> Tuple[List[Loan], int]:
+        """
+        Get a page of a user's loans together with the number of loans the user has, in a single query
+        :param user_id: ID of the user to retrieve loans for
+        :param limit: Number of loans to return
+        :param offset: Offset for pagination
+        :return: Tuple of (list of Loan objects, total number of loans for the user)
+        """
+
+        query = """
+            SELECT id, user_id, book_id, loan_date, due_date, returned_date, fine_amount,
+                   COUNT(*) OVER () AS total
+            FROM loans 
+            WHERE user_id = %s
+            ORDER BY loan_date DESC 
+            LIMIT %s OFFSET %s
+        """
+        try:
+            results = execute_read(query, (user_id, limit, offset), prepared=True, dict_rows=False)
+            if not results:
+                # Past the last page the window has no rows to report the total on
+                return [], LoanRepository.count_for_user(user_id) if offset else 0
+            return [Loan.from_row(row[:-1]) for row in results], results[0][-1]
+        except Exception as e:
+            logger.error(f"Error getting loans with total for user {user_id}: {e}")
+            raise
+
     @staticmethod
     def get_by_book_id(book_id: int, limit: int = 100, offset: int = 0) -> List[Loan]:
         """
@@ -158,12 +243,112 @@ class LoanRepository:
             LIMIT %s OFFSET %s
         """
         try:
-            results = execute_query(query, (book_id, limit, offset), fetch=True)
-            return [Loan.from_dict(dict(row)) for row in results]
+            results = execute_read(query, (book_id, limit, offset), prepared=True, dict_rows=False)
+            return [Loan.from_row(row) for row in results]
         except Exception as e:
             logger.error(f"Error getting loans for book {book_id}: {e}")
             raise
 
+    @staticmethod
+    def get_by_book_id_with_total(book_id: int, limit: int = 100, offset: int = 0) -> Tuple[List[Loan], int]:
+        """
+        Get a page of a book's loans together with the number of loans the book has, in a single query
+        :param book_id: ID of the book to retrieve loans for
+        :param limit: Number of loans to return
+        :param offset: Offset for pagination
+        :return: Tuple of (list of Loan objects, total number of loans for the book)
+        """
+
+        query = """
+            SELECT id, user_id, book_id, loan_date, due_date, returned_date, fine_amount,
+                   COUNT(*) OVER () AS total
+            FROM loans 
+            WHERE book_id = %s
+            ORDER BY loan_date DESC 
+            LIMIT %s OFFSET %s
+        """
+        try:
+            results = execute_read(query, (book_id, limit, offset), prepared=True, dict_rows=False)
+            if not results:
+                # Past the last page the window has no rows to report the total on
+                return [], LoanRepository.count_for_book(book_id) if offset else 0
+            return [Loan.from_row(row[:-1]) for row in results], results[0][-1]
+        except Exception as e:
+            logger.error(f"Error getting loans with total for book {book_id}: {e}")
+            raise
+
+    @staticmethod
+    def iter_all(status: str = None) -> Iterator[Loan]:
+        """
+        Stream every loan with optional status filter through a server-side cursor, newest first,
+        without loading them all in memory
+        :param status: Filter by loan status ('active', 'returned', 'overdue')
+        :return: Generator of Loan objects
+        """
+
+        query = """
+            SELECT id, user_id, book_id, loan_date, due_date, returned_date, fine_amount
+            FROM loans
+        """
+
+        if status == 'active':
+            query += " WHERE returned_date IS NULL"
+        elif status == 'returned':
+            query += " WHERE returned_date IS NOT NULL"
+        elif status == 'overdue':
+            query += " WHERE returned_date IS NULL AND due_date < NOW()"
+
+        query += " ORDER BY loan_date DESC"
+
+        try:
+            for row in stream_query(query, chunk_size=1000, dict_rows=False):
+                yield Loan.from_row(row)
+        except Exception as e:
+            logger.error(f"Error streaming all loans: {e}")
+            raise
+
+    @staticmethod
+    def iter_by_user_id(user_id: int) -> Iterator[Loan]:
+        """
+        Stream every loan of a specific user through a server-side cursor, newest first
+        :param user_id: ID of the user to retrieve loans for
+        :return: Generator of Loan objects
+        """
+
+        query = """
+            SELECT id, user_id, book_id, loan_date, due_date, returned_date, fine_amount
+            FROM loans 
+            WHERE user_id = %s
+            ORDER BY loan_date DESC
+        """
+        try:
+            for row in stream_query(query, (user_id,), chunk_size=1000, dict_rows=False):
+                yield Loan.from_row(row)
+        except Exception as e:
+            logger.error(f"Error streaming loans for user {user_id}: {e}")
+            raise
+
+    @staticmethod
+    def iter_by_book_id(book_id: int) -> Iterator[Loan]:
+        """
+        Stream every loan of a specific book through a server-side cursor, newest first
+        :param book_id: ID of the book to retrieve loans for
+        :return: Generator of Loan objects
+        """
+
+        query = """
+            SELECT id, user_id, book_id, loan_date, due_date, returned_date, fine_amount
+            FROM loans 
+            WHERE book_id = %s
+            ORDER BY loan_date DESC
+        """
+        try:
+            for row in stream_query(query, (book_id,), chunk_size=1000, dict_rows=False):
+                yield Loan.from_row(row)
+        except Exception as e:
+            logger.error(f"Error streaming loans for book {book_id}: {e}")
+            raise
+
     @staticmethod
     def get_overdue_loans() -> List[Loan]:
         """Get all overdue loans
@@ -177,8 +362,8 @@ class LoanRepository:
             ORDER BY due_date ASC
         """
         try:
-            results = execute_query(query, fetch=True)
-            return [Loan.from_dict(dict(row)) for row in results]
+            results = execute_read(query, dict_rows=False)
+            return [Loan.from_row(row) for row in results]
         except Exception as e:
             logger.error(f"Error getting overdue loans: {e}")
             raise
@@ -197,7 +382,7 @@ class LoanRepository:
             WHERE book_id = %s AND returned_date IS NULL
         """
         try:
-            result = execute_single_query(query, (book_id,))
+            result = execute_read(query, (book_id,), one=True, prepared=True)
             return result['count'] if result else 0
         except Exception as e:
             logger.error(f"Error counting active loans for book {book_id}: {e}")
@@ -208,17 +393,15 @@ class LoanRepository:
         """
         Mark a loan as returned and update book availability atomically
         :param loan_id: ID of the loan to return
-        :param returned_date: Date the book was returned, defaults to current time if None
+        :param returned_date: Date the book was returned, defaults to the database's current UTC time if None
         :return: Loan object if updated successfully, None if loan not found or already returned
         """
 
-        if returned_date is None:
-            returned_date = datetime.utcnow()
-
+        # Dates are stored as naive UTC, so the default is the server's NOW() converted to UTC
         query = """
             WITH loan_update AS (
                 UPDATE loans 
-                SET returned_date = %s
+                SET returned_date = COALESCE(%s::timestamp, NOW() AT TIME ZONE 'UTC')
                 WHERE id = %s AND returned_date IS NULL
                 RETURNING id, user_id, book_id, loan_date, due_date, returned_date, fine_amount
             ),
@@ -232,13 +415,14 @@ class LoanRepository:
             FROM loan_update l, book_update b
         """
         try:
-            result = execute_single_query(query, (returned_date, loan_id))
+            result = execute_single_query(query, (returned_date, loan_id), prepared=True, dict_rows=False)
             if result:
+                returned_loan = Loan.from_row(result[:-1])
+                LoanRepository.invalidate_cache(loan_id)
+                BookRepository.invalidate_cache(returned_loan.book_id)
                 # Note: copies_available is returned but not part of Loan model, used for logging / validation
-                loan_data = dict(result)
-                copies_available = loan_data.pop('copies_available', None)
-                logger.info(f"Book returned successfully for loan {loan_id}. Book {loan_data['book_id']} now has {copies_available} copies available")
-                return Loan.from_dict(loan_data)
+                logger.info(f"Book returned successfully for loan {loan_id}. Book {returned_loan.book_id} now has {result[-1]} copies available")
+                return returned_loan
             return None
         except Exception as e:
             logger.error(f"Error returning book for loan {loan_id}: {e}")
@@ -260,10 +444,11 @@ class LoanRepository:
             RETURNING id, user_id, book_id, loan_date, due_date, returned_date, fine_amount
         """
         try:
-            result = execute_single_query(query, (new_due_date, loan_id))
+            result = execute_single_query(query, (new_due_date, loan_id), prepared=True, dict_rows=False)
             if result:
+                LoanRepository.invalidate_cache(loan_id)
                 logger.info(f"Loan {loan_id} renewed successfully. New due date: {new_due_date}")
-                return Loan.from_dict(dict(result))
+                return Loan.from_row(result)
             return None
         except Exception as e:
             logger.error(f"Error renewing loan {loan_id}: {e}")
@@ -285,15 +470,47 @@ class LoanRepository:
             RETURNING id, user_id, book_id, loan_date, due_date, returned_date, fine_amount
         """
         try:
-            result = execute_single_query(query, (fine_amount, loan_id))
+            result = execute_single_query(query, (fine_amount, loan_id), prepared=True, dict_rows=False)
             if result:
+                LoanRepository.invalidate_cache(loan_id)
                 logger.info(f"Fine updated for loan {loan_id}: ${fine_amount}")
-                return Loan.from_dict(dict(result))
+                return Loan.from_row(result)
             return None
         except Exception as e:
             logger.error(f"Error updating fine for loan {loan_id}: {e}")
             raise
 
+    @staticmethod
+    def recompute_overdue_fines(fine_per_day: float = 1.0) -> int:
+        """
+        Recompute the fine of every overdue loan in a single statement, charging fine_per_day for each
+        full day past the due date like Loan.calculate_fine does
+        :param fine_per_day: Fine amount charged per day of delay
+        :return: Number of loans whose fine changed
+        """
+
+        # Dates are stored as naive UTC, so the overdue days are counted against the current UTC time
+        query = """
+            UPDATE loans 
+            SET fine_amount = f.fine_amount
+            FROM (
+                SELECT id, FLOOR(EXTRACT(EPOCH FROM (NOW() AT TIME ZONE 'UTC') - due_date) / 86400)::numeric
+                           * %s::numeric AS fine_amount
+                FROM loans 
+                WHERE returned_date IS NULL AND due_date <= (NOW() AT TIME ZONE 'UTC') - INTERVAL '1 day'
+            ) f
+            WHERE loans.id = f.id AND loans.fine_amount IS DISTINCT FROM f.fine_amount
+        """
+        try:
+            rows_affected = execute_write(query, (fine_per_day,), prepared=True)
+            if rows_affected > 0:
+                _loan_cache.clear()
+                logger.info(f"Recomputed fines for {rows_affected} overdue loans")
+            return rows_affected
+        except Exception as e:
+            logger.error(f"Error recomputing overdue fines: {e}")
+            raise
+
     @staticmethod
     def count(status: str = None) -> int:
         """
@@ -314,12 +531,64 @@ class LoanRepository:
             query = base_query
 
         try:
-            result = execute_single_query(query)
+            result = execute_read(query, one=True)
             return result['count'] if result else 0
         except Exception as e:
             logger.error(f"Error counting loans: {e}")
             raise
 
+    @staticmethod
+    def count_by_status() -> dict:
+        """
+        Count loans per status in a single pass over the loans table
+        :return: Dictionary with the total, active, returned and overdue loan counts
+        """
+
+        query = """
+            SELECT COUNT(*) as total,
+                   COUNT(*) FILTER (WHERE returned_date IS NULL) as active,
+                   COUNT(*) FILTER (WHERE returned_date IS NOT NULL) as returned,
+                   COUNT(*) FILTER (WHERE returned_date IS NULL AND due_date < NOW()) as overdue
+            FROM loans
+        """
+        try:
+            return dict(execute_read(query, one=True))
+        except Exception as e:
+            logger.error(f"Error counting loans by status: {e}")
+            raise
+
+    @staticmethod
+    def count_for_user(user_id: int) -> int:
+        """
+        Get count of all loans (active and returned) of a user
+        :param user_id: ID of the user to count loans for
+        :return: Count of loans for the user
+        """
+
+        query = "SELECT COUNT(*) as count FROM loans WHERE user_id = %s"
+        try:
+            result = execute_read(query, (user_id,), one=True, prepared=True)
+            return result['count'] if result else 0
+        except Exception as e:
+            logger.error(f"Error counting loans for user {user_id}: {e}")
+            raise
+
+    @staticmethod
+    def count_for_book(book_id: int) -> int:
+        """
+        Get count of all loans (active and returned) of a book
+        :param book_id: ID of the book to count loans for
+        :return: Count of loans for the book
+        """
+
+        query = "SELECT COUNT(*) as count FROM loans WHERE book_id = %s"
+        try:
+            result = execute_read(query, (book_id,), one=True, prepared=True)
+            return result['count'] if result else 0
+        except Exception as e:
+            logger.error(f"Error counting loans for book {book_id}: {e}")
+            raise
+
     @staticmethod
     def count_user_active_loans(user_id: int) -> int:
         """
@@ -334,7 +603,7 @@ class LoanRepository:
             WHERE user_id = %s AND returned_date IS NULL
         """
         try:
-            result = execute_single_query(query, (user_id,))
+            result = execute_read(query, (user_id,), one=True, prepared=True)
             return result['count'] if result else 0
         except Exception as e:
             logger.error(f"Error counting active loans for user {user_id}: {e}")
@@ -348,19 +617,26 @@ class LoanRepository:
         :return: Dictionary with book availability info including total copies, available copies, total loans ever, and current active loans
         """
 
+        # Both loan counts come from a single pass over the book's loans
         query = """
             SELECT 
                 b.id,
                 b.title,
                 b.copies_total,
                 b.copies_available,
-                (SELECT COUNT(*) FROM loans WHERE book_id = b.id) as total_loans_ever,
-                (SELECT COUNT(*) FROM loans WHERE book_id = b.id AND returned_date IS NULL) as current_active_loans
+                s.total_loans_ever,
+                s.current_active_loans
             FROM books b
+            CROSS JOIN LATERAL (
+                SELECT COUNT(*) as total_loans_ever,
+                       COUNT(*) FILTER (WHERE returned_date IS NULL) as current_active_loans
+                FROM loans
+                WHERE book_id = b.id
+            ) s
             WHERE b.id = %s
         """
         try:
-            result = execute_single_query(query, (book_id,))
+            result = execute_read(query, (book_id,), one=True)
             if result:
                 return dict(result)
             return {}
@@ -378,8 +654,9 @@ class LoanRepository:
 
         query = "DELETE FROM loans WHERE id = %s"
         try:
-            rows_affected = execute_query(query, (loan_id,))
+            rows_affected = execute_write(query, (loan_id,), prepared=True)
             if rows_affected > 0:
+                LoanRepository.invalidate_cache(loan_id)
                 logger.warning(f"Loan {loan_id} deleted - this should be rare")
                 return True
             return False
@@ -1,4 +1,37 @@
+import re
+
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from utils.ttl_cache import TTLCache, MISSING
+
+# Decoded responses keyed by (path, sorted params), kept for the response's Cache-Control max-age
+# when it sends one and CACHE_TTL seconds otherwise. Entries are whole payloads, so the cache is kept small
+CACHE_TTL = 3600
+_cache = TTLCache(maxsize=500, ttl=CACHE_TTL)
+
+# Fields returned for each search result, a full search document carries dozens of large lists
+SEARCH_FIELDS = "title,language,author_key"
+_MAX_AGE_RE = re.compile(r'max-age=(\d+)')
+
+# (connect, read) timeouts in seconds for every Open Library request
+REQUEST_TIMEOUT = (3.05, 10)
+
+
+def _build_session():
+    """
+    Build the HTTP session shared by every Open Library request
+    Its connection pool keeps sockets to openlibrary.org alive across calls, so the TCP and TLS handshakes
+    are paid once, and transient failures are retried with backoff
+    :return: requests.Session object
+    """
+    session = requests.Session()
+    retries = Retry(total=3, backoff_factor=0.2, status_forcelist=[429, 500, 502, 503, 504],
+                    allowed_methods=["GET"])
+    session.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=retries))
+    return session
 
 
 class OpenLibraryRepository:
@@ -6,24 +39,53 @@ class OpenLibraryRepository:
     OpenLibraryRepository is a class that interacts with the Open Library API to search for books
     and retrieve information about authors and their works.
     It provides methods to search for books by title and to get books by a specific author.
-    It uses the requests library to make HTTP GET requests to the Open Library API endpoints.
+    It uses a shared requests session to make HTTP GET requests to the Open Library API endpoints.
     This class does not require any authentication to access the Open Library API.
+    Responses are cached in process, so repeated lookups do not go back to the network.
     """
     BASE_URL = "https://openlibrary.org"
+    _session = _build_session()
+
+    @staticmethod
+    def _get_json(path, params):
+        """
+        GET an Open Library endpoint, serving it from the response cache when possible
+        :param path: Path of the endpoint, relative to BASE_URL
+        :param params: Query string parameters
+        :return: Decoded JSON response
+        """
+
+        key = (path, tuple(sorted(params.items())))
+        cached = _cache.get(key)
+        if cached is not MISSING:
+            return cached
+
+        response = OpenLibraryRepository._session.get(f"{OpenLibraryRepository.BASE_URL}{path}", params=params,
+                                                      timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        # orjson decodes the raw body several times faster than response.json()
+        data = orjson.loads(response.content)
+
+        cache_control = response.headers.get('Cache-Control', '')
+        if 'no-store' not in cache_control:
+            max_age = _MAX_AGE_RE.search(cache_control)
+            _cache.set(key, data, ttl=int(max_age.group(1)) if max_age else None)
+        return data
 
     @staticmethod
-    def search_book_by_title(title):
+    def search_book_by_title(title, limit=1):
         """
         Search for a book by its title using the Open Library API.
+        Only the SEARCH_FIELDS of each matching book are returned.
         :param title: Title of the book to search for
+        :param limit: Number of matching books to return, best match first (default is 1)
         :return: JSON response containing book details
         """
 
         try:
-            response = requests.get(f"{OpenLibraryRepository.BASE_URL}/search.json", params={"title": title})
-            response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
+            return OpenLibraryRepository._get_json("/search.json",
+                                                   {"title": title, "fields": SEARCH_FIELDS, "limit": limit})
+        except (requests.RequestException, orjson.JSONDecodeError) as e:
             raise RuntimeError(f"OpenLibraryRepository: Failed to search book by title: {e}")
 
     @staticmethod
@@ -36,8 +98,6 @@ class OpenLibraryRepository:
         """
 
         try:
-            response = requests.get(f"{OpenLibraryRepository.BASE_URL}/authors/{author_id}/works.json", params={"limit": limit})
-            response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
+            return OpenLibraryRepository._get_json(f"/authors/{author_id}/works.json", {"limit": limit})
+        except (requests.RequestException, orjson.JSONDecodeError) as e:
             raise RuntimeError(f"OpenLibraryRepository: Failed to get books by author: {e}")
@@ -1,6 +1,6 @@
 from typing import List, Optional, Dict, Any
 import logging
-from models.database import execute_query, execute_single_query
+from models.database import execute_read, execute_write, execute_single_query
 from models.user_model import User
 
 logger = logging.getLogger(__name__)
@@ -69,7 +69,7 @@ class UserRepository:
                        phone, address, membership_date, max_loans
                 FROM users WHERE id = %s
             """
-            result = execute_single_query(query, (user_id,))
+            result = execute_read(query, (user_id,), one=True, prepared=True)
 
             if result:
                 return User(
@@ -104,7 +104,7 @@ class UserRepository:
                        phone, address, membership_date, max_loans
                 FROM users WHERE username = %s
             """
-            result = execute_single_query(query, (username,))
+            result = execute_read(query, (username,), one=True, prepared=True)
 
             if result:
                 return User(
@@ -138,7 +138,7 @@ class UserRepository:
                        phone, address, membership_date, max_loans
                 FROM users WHERE email = %s
             """
-            result = execute_single_query(query, (email,))
+            result = execute_read(query, (email,), one=True, prepared=True)
 
             if result:
                 return User(
@@ -159,6 +159,31 @@ class UserRepository:
             logger.error(f"Error getting user by email {email}: {e}")
             raise
 
+    @staticmethod
+    def get_many_by_ids(user_ids: List[int]) -> List[User]:
+        """
+        Get several users by ID in a single query
+        :param user_ids: IDs of the users to retrieve
+        :return: List of the User objects found, in no particular order
+        """
+
+        if not user_ids:
+            return []
+
+        try:
+            query = """
+                SELECT id, username, email, password_hash, first_name, last_name, 
+                       phone, address, membership_date, max_loans
+                FROM users WHERE id = ANY(%s)
+            """
+            results = execute_read(query, (list(user_ids),), prepared='users_by_ids', dict_rows=False)
+
+            return [User.from_row(row) for row in results]
+
+        except Exception as e:
+            logger.error(f"Error getting users by ids {user_ids}: {e}")
+            raise
+
     @staticmethod
     def get_all(limit: int = 100, offset: int = 0) -> List[User]:
         """
@@ -176,24 +201,9 @@ class UserRepository:
                 ORDER BY membership_date DESC
                 LIMIT %s OFFSET %s
             """
-            results = execute_query(query, (limit, offset), fetch=True)
+            results = execute_read(query, (limit, offset), dict_rows=False)
 
-            users = []
-            for result in results:
-                users.append(User(
-                    id=result['id'],
-                    username=result['username'],
-                    email=result['email'],
-                    password_hash=result['password_hash'],
-                    first_name=result['first_name'],
-                    last_name=result['last_name'],
-                    phone=result['phone'],
-                    address=result['address'],
-                    membership_date=result['membership_date'],
-                    max_loans=result['max_loans']
-                ))
-
-            return users
+            return [User.from_row(row) for row in results]
 
         except Exception as e:
             logger.error(f"Error getting all users: {e}")
@@ -264,7 +274,7 @@ class UserRepository:
 
         try:
             query = "DELETE FROM users WHERE id = %s"
-            rows_affected = execute_query(query, (user_id,))
+            rows_affected = execute_write(query, (user_id,))
             return rows_affected > 0
 
         except Exception as e:
@@ -283,10 +293,10 @@ class UserRepository:
         try:
             if exclude_id:
                 query = "SELECT 1 FROM users WHERE username = %s AND id != %s"
-                result = execute_single_query(query, (username, exclude_id))
+                result = execute_read(query, (username, exclude_id), one=True)
             else:
                 query = "SELECT 1 FROM users WHERE username = %s"
-                result = execute_single_query(query, (username,))
+                result = execute_read(query, (username,), one=True)
 
             return result is not None
 
@@ -305,10 +315,10 @@ class UserRepository:
         try:
             if exclude_id:
                 query = "SELECT 1 FROM users WHERE email = %s AND id != %s"
-                result = execute_single_query(query, (email, exclude_id))
+                result = execute_read(query, (email, exclude_id), one=True)
             else:
                 query = "SELECT 1 FROM users WHERE email = %s"
-                result = execute_single_query(query, (email,))
+                result = execute_read(query, (email,), one=True)
 
             return result is not None
 
@@ -325,7 +335,7 @@ class UserRepository:
 
         try:
             query = "SELECT COUNT(*) as count FROM users"
-            result = execute_single_query(query)
+            result = execute_read(query, one=True)
             return result['count'] if result else 0
 
         except Exception as e:
@@ -359,24 +369,9 @@ class UserRepository:
             params = (search_pattern, search_pattern, search_pattern,
                       search_pattern, search_pattern, limit, offset)
 
-            results = execute_query(query, params, fetch=True)
-
-            users = []
-            for result in results:
-                users.append(User(
-                    id=result['id'],
-                    username=result['username'],
-                    email=result['email'],
-                    password_hash=result['password_hash'],
-                    first_name=result['first_name'],
-                    last_name=result['last_name'],
-                    phone=result['phone'],
-                    address=result['address'],
-                    membership_date=result['membership_date'],
-                    max_loans=result['max_loans']
-                ))
+            results = execute_read(query, params, dict_rows=False)
 
-            return users
+            return [User.from_row(row) for row in results]
 
         except Exception as e:
             logger.error(f"Error searching users: {e}")
@@ -1,7 +1,9 @@
-from flask import Blueprint, request
+from itertools import chain
+from flask import Blueprint, Response, request, stream_with_context
 import logging
 from services.book_service import BookService
-from utils.route_helpers import create_response, handle_exception, handle_service_result, get_validated_json
+from utils.route_helpers import create_response, handle_exception, handle_service_result, get_validated_json, \
+    json_array_stream
 
 logger = logging.getLogger(__name__)
 book_bp = Blueprint('books', __name__)
@@ -18,6 +20,12 @@ def get_books():
     """
 
     try:
+        # Keyset pagination: ?after=<last id>&limit=<n>
+        after = request.args.get('after', type=int)
+        if after is not None:
+            result = book_service.get_books_after(after=after, limit=request.args.get('limit', 20, type=int))
+            return handle_service_result(result)
+
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
         search = request.args.get('search', '').strip()
@@ -137,6 +145,28 @@ def search_books():
         return handle_exception('search_books', e)
 
 
+@book_bp.route('/export', methods=['GET'])
+def export_books():
+    """
+    This endpoint streams every book with its genres as a JSON array.
+    Rows are read from the database in chunks and written out as they arrive.
+    The first book is read before the response starts, so connection and query errors still get an error response;
+    a failure after that can only cut the stream short, since the 200 status has already been sent.
+    :return: A streamed JSON response containing all books or an error message.
+    """
+    try:
+        books = book_service.iter_all_books()
+        first_book = next(books, None)
+        if first_book is not None:
+            books = chain((first_book,), books)
+        return Response(
+            stream_with_context(json_array_stream(books)),
+            mimetype='application/json'
+        )
+    except Exception as e:
+        return handle_exception('export_books', e)
+
+
 @book_bp.route('/available', methods=['GET'])
 def get_available_books():
     """
@@ -59,9 +59,9 @@ def get_all_users():
         else:
             users, result = user_service.get_all_users(page, per_page)
 
-        users_data = [user.to_dict() for user in users]
+        # User objects are serialized through to_dict by the app's JSON provider
         return handle_service_result(result, data={
-            'users': users_data,
+            'users': users,
             'pagination': result.get('pagination', {}),
             'search_term': result.get('search_term')
         })
@@ -159,9 +159,9 @@ def search_users():
             )
 
         users, result = user_service.search_users(search_term, page, per_page)
-        users_data = [user.to_dict() for user in users]
+        # User objects are serialized through to_dict by the app's JSON provider
         return handle_service_result(result, data={
-            'users': users_data,
+            'users': users,
             'pagination': result.get('pagination', {}),
             'search_term': result.get('search_term')
         })
@@ -1,9 +1,10 @@
-from typing import List, Optional, Dict, Any
+from typing import Iterator, List, Optional, Dict, Any, Tuple
 from repositories.book_repository import BookRepository
 from repositories.genre_repository import GenreRepository
 from repositories.book_genre_repository import BookGenreRepository
 from models.book_model import Book
-from models.database import get_db_connection
+from models.genre_model import Genre
+from models.database import db_conn
 from utils.validators import validate_book_data
 import logging
 
@@ -48,21 +49,21 @@ class BookService:
             return 'Invalid genre ID'
         return None
 
-    def _validate_genres_exist(self, genre_ids: List[int]) -> Optional[str]:
+    def _validate_genres_exist(self, genre_ids: List[int]) -> Tuple[Dict[int, Genre], Optional[str]]:
         """
         Validate that all genre IDs exist in database
         :param genre_ids: List of genre IDs to validate
-        :return: None if all exist, error message if any do not exist
+        :return: Tuple of (found genres by ID, None if all exist or error message if any do not exist)
         """
 
         if not genre_ids:
-            return None
+            return {}, None
 
+        genres_by_id = {genre.id: genre for genre in self.genre_repo.get_by_ids(genre_ids)}
         for genre_id in genre_ids:
-            genre = self.genre_repo.get_by_id(genre_id)
-            if not genre:
-                return f'Genre with ID {genre_id} does not exist'
-        return None
+            if genre_id not in genres_by_id:
+                return genres_by_id, f'Genre with ID {genre_id} does not exist'
+        return genres_by_id, None
 
     @staticmethod
     def _handle_exception(operation: str, error: Exception) -> Dict[str, Any]:
@@ -115,7 +116,7 @@ class BookService:
 
             # Validate genre IDs exist
             genre_ids = book_data.get('genre_ids', [])
-            genre_error = self._validate_genres_exist(genre_ids)
+            genres_by_id, genre_error = self._validate_genres_exist(genre_ids)
             if genre_error:
                 return {'success': False, 'error': genre_error}
 
@@ -133,7 +134,7 @@ class BookService:
             )
 
             # Use transaction to ensure atomicity
-            with get_db_connection() as conn:
+            with db_conn() as conn:
                 try:
                     # Create book using repository with connection
                     created_book = self.book_repo.create(book, conn=conn)
@@ -142,11 +143,7 @@ class BookService:
 
                     # Add genre relationships if provided
                     if genre_ids:
-                        for genre_id in genre_ids:
-                            success = self.book_genre_repo.add_genre_to_book(
-                                created_book.id, genre_id, conn=conn)
-                            if not success:
-                                raise Exception(f"Failed to add genre {genre_id} to book")
+                        self.book_genre_repo.bulk_create(created_book.id, genre_ids, conn=conn)
 
                     # Commit happens automatically when exiting context manager
 
@@ -157,17 +154,12 @@ class BookService:
             # Prepare the response with the created book
             book_dict = created_book.to_dict()
 
-            # Add genre information to the response
+            # Add genre information to the response, reusing the genres loaded during validation
             if genre_ids:
-                genres = []
-                for genre_id in genre_ids:
-                    genre = self.genre_repo.get_by_id(genre_id)
-                    if genre:
-                        genres.append({
-                            'id': genre.id,
-                            'name': genre.name
-                        })
-                book_dict['genres'] = genres
+                book_dict['genres'] = [
+                    {'id': genre_id, 'name': genres_by_id[genre_id].name}
+                    for genre_id in genre_ids if genre_id in genres_by_id
+                ]
             else:
                 book_dict['genres'] = []
 
@@ -194,8 +186,8 @@ class BookService:
             if book_id_error:
                 return {'success': False, 'error': book_id_error}
 
-            # Check if book exists
-            existing_book = self.book_repo.get_by_id(book_id)
+            # Check if book exists, read uncached since its copy counts are written back below
+            existing_book = self.book_repo.get_by_id(book_id, use_cache=False)
             if not existing_book:
                 return {'success': False, 'error': 'Book not found'}
 
@@ -218,7 +210,7 @@ class BookService:
 
             # Validate genre IDs exist
             genre_ids = book_data.get('genre_ids', [])
-            genre_error = self._validate_genres_exist(genre_ids)
+            _, genre_error = self._validate_genres_exist(genre_ids)
             if genre_error:
                 return {'success': False, 'error': genre_error}
 
@@ -239,35 +231,32 @@ class BookService:
             logger.info(f"Genre IDs to be assigned: {genre_ids}")
 
             # Use transaction to ensure atomicity
-            with get_db_connection() as conn:
+            with db_conn() as conn:
                 try:
+                    # Update genre relationships first if provided, so the book update returns the new genres
+                    if 'genre_ids' in book_data:
+                        # Replace genre relationships in a single statement regardless of the number of genres
+                        self.book_genre_repo.update_book_genres(book_id, genre_ids, conn=conn)
+
                     # Update book using repository with connection
                     updated_book = self.book_repo.update(book_id, updated_book_data, conn=conn)
                     if not updated_book:
                         raise Exception("Failed to update book")
 
-                    # Update genre relationships if provided
-                    if 'genre_ids' in book_data:
-                        # Remove existing genre relationships
-                        self.book_genre_repo.remove_all_genres_from_book(book_id, conn=conn)
-
-                        # Add new genre relationships
-                        for genre_id in genre_ids:
-                            success = self.book_genre_repo.add_genre_to_book(book_id, genre_id, conn=conn)
-                            if not success:
-                                raise Exception(f"Failed to add genre {genre_id} to book")
+                    # Commit happens automatically when exiting context manager
 
                 except Exception as db_error:
                     # Rollback happens automatically on exception
                     raise db_error
 
-            # Get updated book with genres
-            final_book = self.book_repo.get_by_id(book_id)
+            # Drop the cached book and genres only now that the transaction has committed, a read in between
+            # would otherwise re-cache the old rows
+            self.book_repo.invalidate_cache(book_id)
+            self.book_genre_repo.invalidate_genres(book_id)
 
-            # Commit happens automatically when exiting context manager
             return {
                 'success': True,
-                'data': final_book.to_dict(),
+                'data': updated_book.to_dict(),
                 'message': 'Book updated successfully'
             }
 
@@ -343,11 +332,9 @@ class BookService:
                 books = self.book_repo.search(search.strip(), genre_ids=genre_ids, limit=per_page)
                 total = len(books)
             elif genre_id:
-                books = self.book_repo.get_by_genre(genre_id, limit=per_page, offset=offset)
-                total = self.book_repo.count(genre_id=genre_id)
+                books, total = self.book_repo.get_by_genre_with_total(genre_id, limit=per_page, offset=offset)
             else:
-                books = self.book_repo.get_all(limit=per_page, offset=offset)
-                total = self.book_repo.count()
+                books, total = self.book_repo.get_all_with_total(limit=per_page, offset=offset)
 
             return {
                 'success': True,
@@ -368,6 +355,39 @@ class BookService:
         except Exception as e:
             return self._handle_exception('get_all_books', e)
 
+    def get_books_after(self, after: Optional[int] = None, limit: int = 20) -> Dict[str, Any]:
+        """
+        Get books ordered by ID using keyset pagination
+        :param after: ID of the last book already received, None or 0 for the first page
+        :param limit: Number of books to return
+        :return: Dictionary with success status and data holding the books and the next cursor
+        """
+
+        try:
+            if limit < 1 or limit > 100:
+                limit = 20
+
+            books, next_id = self.book_repo.get_page_after(after_id=after or None, limit=limit)
+            return {
+                'success': True,
+                'data': {
+                    'items': [book.to_dict() for book in books],
+                    'next': next_id
+                }
+            }
+
+        except Exception as e:
+            return self._handle_exception('get_books_after', e)
+
+    def iter_all_books(self) -> Iterator[Dict[str, Any]]:
+        """
+        Stream every book as a dictionary, for exports that should not be materialized in memory
+        :return: Generator of book dictionaries with genres
+        """
+
+        for book in self.book_repo.iter_all():
+            yield book.to_dict()
+
     def delete_book(self, book_id: int) -> Dict[str, Any]:
         """
         Delete a book
@@ -349,8 +349,8 @@ class GenreService:
                 return error
 
             # Check if genre has associated books
-            book_count = self.book_genre_repo.count_books_in_genre(genre_id)
-            if book_count > 0:
+            if self.book_genre_repo.genre_has_any_book(genre_id):
+                book_count = self.book_genre_repo.count_books_in_genre(genre_id)
                 return {
                     'success': False,
                     'error': f'Cannot delete genre: it has {book_count} associated books'
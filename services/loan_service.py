@@ -1,9 +1,11 @@
-from typing import Optional, Dict, Any
+from typing import List, Optional, Dict, Any
 from datetime import timedelta
 from repositories.loan_repository import LoanRepository
 from repositories.user_repository import UserRepository
 from repositories.book_repository import BookRepository
+from models.book_model import Book
 from models.loan_model import Loan
+from models.user_model import User
 from utils.loans_validation import validate_loan_data, validate_return_data, validate_renewal_data
 import logging
 
@@ -98,14 +100,16 @@ class LoanService:
             return 'Book not found'
         return None
 
-    def _check_loan_exists_and_active(self, loan_id: int) -> tuple[Optional[Loan], Optional[str]]:
+    def _check_loan_exists_and_active(self, loan_id: int,
+                                      use_cache: bool = True) -> tuple[Optional[Loan], Optional[str]]:
         """
         Check if a loan exists and is active.
         :param loan_id: int - The ID of the loan.
+        :param use_cache: bool - Whether the loan may come from the in-process cache, False before a mutation.
         :return: Tuple[Optional[Loan], Optional[str]] - The loan object if found, or error message if not.
         """
 
-        loan = self.loan_repo.get_by_id(loan_id)
+        loan = self.loan_repo.get_by_id(loan_id, use_cache=use_cache)
         if not loan:
             return None, 'Loan not found'
         return loan, None
@@ -262,11 +266,10 @@ class LoanService:
             page, per_page = self._validate_pagination(page, per_page)
             offset = (page - 1) * per_page
 
-            loans = self.loan_repo.get_all(limit=per_page, offset=offset, status=status)
-            total = self.loan_repo.count(status=status)
+            loans, total = self.loan_repo.get_all_with_total(limit=per_page, offset=offset, status=status)
 
             # Enrich loan data
-            enriched_loans = [self._enrich_loan_data(loan) for loan in loans]
+            enriched_loans = self._enrich_loans(loans)
 
             return {
                 'success': True,
@@ -307,12 +310,11 @@ class LoanService:
             page, per_page = self._validate_pagination(page, per_page)
             offset = (page - 1) * per_page
 
-            loans = self.loan_repo.get_by_user_id(user_id, limit=per_page, offset=offset)
-            total = len(self.loan_repo.get_by_user_id(user_id, limit=10000, offset=0))
+            loans, total = self.loan_repo.get_by_user_id_with_total(user_id, limit=per_page, offset=offset)
 
             # Get user info
             user = self.user_repo.get_by_id(user_id)
-            enriched_loans = [self._enrich_loan_data(loan) for loan in loans]
+            enriched_loans = self._enrich_loans(loans)
 
             return {
                 'success': True,
@@ -351,7 +353,7 @@ class LoanService:
                     return validation_error
 
             # Check if loan exists and is active
-            loan, error = self._check_loan_exists_and_active(loan_id)
+            loan, error = self._check_loan_exists_and_active(loan_id, use_cache=False)
             if error:
                 return {'success': False, 'error': error}
 
@@ -411,7 +413,7 @@ class LoanService:
                     return validation_error
 
             # Check if loan exists and is active
-            loan, error = self._check_loan_exists_and_active(loan_id)
+            loan, error = self._check_loan_exists_and_active(loan_id, use_cache=False)
             if error:
                 return {'success': False, 'error': error}
 
@@ -457,22 +459,13 @@ class LoanService:
         :return: Dict[str, Any] - A dictionary containing overdue loan data and total accumulated fines.
         """
         try:
+            # Bring every overdue fine up to date in the database, then read the loans back with them
+            self.loan_repo.recompute_overdue_fines()
             loans = self.loan_repo.get_overdue_loans()
 
-            # Enrich and update fines
-            enriched_loans = []
-            total_fines = 0.0
+            total_fines = sum(float(loan.fine_amount) for loan in loans)
 
-            for loan in loans:
-                # Update fine calculation
-                fine_amount = loan.calculate_fine()
-                if fine_amount != loan.fine_amount:
-                    self.loan_repo.update_fine(loan.id, fine_amount)
-                    loan.fine_amount = fine_amount
-
-                enriched_loan = self._enrich_loan_data(loan)
-                enriched_loans.append(enriched_loan)
-                total_fines += fine_amount
+            enriched_loans = self._enrich_loans(loans)
 
             logger.info(f"Retrieved {len(enriched_loans)} overdue loans with total fines: ${total_fines}")
 
@@ -507,12 +500,11 @@ class LoanService:
             page, per_page = self._validate_pagination(page, per_page)
             offset = (page - 1) * per_page
 
-            loans = self.loan_repo.get_by_book_id(book_id, limit=per_page, offset=offset)
-            total = len(self.loan_repo.get_by_book_id(book_id, limit=10000, offset=0))
+            loans, total = self.loan_repo.get_by_book_id_with_total(book_id, limit=per_page, offset=offset)
 
             # Get book info
             book = self.book_repo.get_by_id(book_id)
-            enriched_loans = [self._enrich_loan_data(loan) for loan in loans]
+            enriched_loans = self._enrich_loans(loans)
             availability_info = self.loan_repo.get_book_availability_info(book_id)
 
             return {
@@ -540,11 +532,12 @@ class LoanService:
         """
 
         try:
-            # Get counts for different loan statuses
-            total_loans = self.loan_repo.count()
-            active_loans = self.loan_repo.count(status='active')
-            returned_loans = self.loan_repo.count(status='returned')
-            overdue_loans = self.loan_repo.count(status='overdue')
+            # Get counts for different loan statuses in one query
+            counts = self.loan_repo.count_by_status()
+            total_loans = counts['total']
+            active_loans = counts['active']
+            returned_loans = counts['returned']
+            overdue_loans = counts['overdue']
 
             # Get overdue loans for fine calculation
             overdue_loan_objects = self.loan_repo.get_overdue_loans()
@@ -587,7 +580,7 @@ class LoanService:
             active_loans = [loan for loan in loans if not loan.returned_date]
 
             # Enrich loan data
-            enriched_loans = [self._enrich_loan_data(loan) for loan in active_loans]
+            enriched_loans = self._enrich_loans(active_loans)
 
             return {
                 'success': True,
@@ -618,7 +611,7 @@ class LoanService:
             active_loans = [loan for loan in loans if not loan.returned_date]
 
             # Enrich loan data
-            enriched_loans = [self._enrich_loan_data(loan) for loan in active_loans]
+            enriched_loans = self._enrich_loans(active_loans)
 
             # Get availability info
             availability_info = self.loan_repo.get_book_availability_info(book_id)
@@ -676,7 +669,7 @@ class LoanService:
                 return {'success': False, 'error': loan_id_error}
 
             # Check if loan exists
-            loan, error = self._check_loan_exists_and_active(loan_id)
+            loan, error = self._check_loan_exists_and_active(loan_id, use_cache=False)
             if error:
                 return {'success': False, 'error': error}
 
@@ -731,31 +724,63 @@ class LoanService:
         :return: Dict[str, Any] - The loan data dictionary enriched with user and book info.
         """
 
-        loan_dict = loan.to_dict()
-
         try:
-            # Add user information
             user = self.user_repo.get_by_id(loan.user_id)
-            if user:
-                loan_dict['user'] = {
-                    'id': user.id,
-                    'username': getattr(user, 'username', 'Unknown'),
-                    'email': getattr(user, 'email', 'Unknown')
-                }
-
-            # Add book information
             book = self.book_repo.get_by_id(loan.book_id)
-            if book:
-                loan_dict['book'] = {
-                    'id': book.id,
-                    'title': getattr(book, 'title', 'Unknown'),
-                    'author': getattr(book, 'author', 'Unknown'),
-                    'isbn': getattr(book, 'isbn', 'Unknown'),
-                    'copies_total': getattr(book, 'copies_total', 0),
-                    'copies_available': getattr(book, 'copies_available', 0)
-                }
-
         except Exception as e:
             logger.warning(f"Error enriching loan data for loan {loan.id}: {e}")
+            return loan.to_dict()
+
+        return self._build_loan_dict(loan, user, book)
+
+    def _enrich_loans(self, loans: List[Loan]) -> List[Dict[str, Any]]:
+        """
+        Add user and book metadata to several loans, fetching all their users and books with one query each.
+        :param loans: List[Loan] - The loan objects to enrich.
+        :return: List[Dict[str, Any]] - The loan data dictionaries enriched with user and book info.
+        """
+
+        if not loans:
+            return []
+
+        try:
+            users = {user.id: user for user in self.user_repo.get_many_by_ids({loan.user_id for loan in loans})}
+            books = {book.id: book for book in self.book_repo.get_many_by_ids({loan.book_id for loan in loans})}
+        except Exception as e:
+            logger.warning(f"Error enriching loan data for {len(loans)} loans: {e}")
+            return [loan.to_dict() for loan in loans]
+
+        return [self._build_loan_dict(loan, users.get(loan.user_id), books.get(loan.book_id)) for loan in loans]
+
+    @staticmethod
+    def _build_loan_dict(loan: Loan, user: Optional[User], book: Optional[Book]) -> Dict[str, Any]:
+        """
+        Build the loan data dictionary with the given user and book info.
+        :param loan: Loan - The loan object to convert.
+        :param user: Optional[User] - The user who borrowed the book, None if not found.
+        :param book: Optional[Book] - The borrowed book, None if not found.
+        :return: Dict[str, Any] - The loan data dictionary enriched with user and book info.
+        """
+
+        loan_dict = loan.to_dict()
+
+        # Add user information
+        if user:
+            loan_dict['user'] = {
+                'id': user.id,
+                'username': getattr(user, 'username', 'Unknown'),
+                'email': getattr(user, 'email', 'Unknown')
+            }
+
+        # Add book information
+        if book:
+            loan_dict['book'] = {
+                'id': book.id,
+                'title': getattr(book, 'title', 'Unknown'),
+                'author': getattr(book, 'author', 'Unknown'),
+                'isbn': getattr(book, 'isbn', 'Unknown'),
+                'copies_total': getattr(book, 'copies_total', 0),
+                'copies_available': getattr(book, 'copies_available', 0)
+            }
 
         return loan_dict
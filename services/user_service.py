@@ -487,6 +487,10 @@ class UserService:
             user = self.user_repository.get_by_username(username.strip())
 
             if user and user.check_password(password):
+                if user.needs_rehash():
+                    # Migrate legacy hashes lazily, the plain text password is only available at login
+                    user.set_password(password)
+                    self.user_repository.update(user.id, {'password_hash': user.password_hash})
                 logger.info(f"User authenticated successfully: {user.username}")
                 return user, {
                     'success': True,
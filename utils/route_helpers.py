@@ -1,5 +1,5 @@
-from flask import request, jsonify
-from typing import Dict, Any
+from flask import request, jsonify, current_app
+from typing import Dict, Any, Iterable, Iterator
 import logging
 
 logger = logging.getLogger(__name__)
@@ -106,3 +106,20 @@ def get_validated_json(required_fields: list[str] = None) -> tuple[dict, None] |
                 status_code=400
             )
     return data, None
+
+
+def json_array_stream(items: Iterable[Any]) -> Iterator[bytes]:
+    """
+    Encode an iterable as a JSON array one element at a time, for streamed responses.
+
+    :param items: Iterable[Any] - JSON-serializable items, typically produced lazily from the database.
+    :return: Iterator[bytes] - Chunks of the JSON array.
+    """
+
+    yield b'['
+    first = True
+    for item in items:
+        chunk = current_app.json.dumps(item).encode()
+        yield chunk if first else b',' + chunk
+        first = False
+    yield b']'
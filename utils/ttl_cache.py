@@ -0,0 +1,69 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Hashable, Optional
+import time
+
+# Returned by TTLCache.get on a miss, so None can be cached as a value
+MISSING = object()
+
+
+class TTLCache:
+    """
+    Thread-safe in-process cache whose entries expire after a fixed number of seconds
+    Once full, the least recently used entry is evicted to make room for a new one
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        """
+        :param maxsize: Maximum number of entries kept
+        :param ttl: Seconds an entry stays valid after it is stored
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: Hashable) -> Any:
+        """
+        Get a cached value
+        :param key: Key the value was stored under
+        :return: The cached value, or MISSING if absent or expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISSING
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return MISSING
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Store a value, evicting the least recently used entry when the cache is full
+        :param key: Key to store the value under
+        :param value: Value to cache
+        :param ttl: Seconds this entry stays valid, defaults to the cache's ttl
+        """
+        with self._lock:
+            self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def pop(self, *keys: Hashable) -> None:
+        """
+        Drop the given keys, ignoring the ones that are not cached
+        :param keys: Keys to drop
+        """
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        Drop every entry
+        """
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,13 @@
+# gevent monkey-patching must run before any other import so that sockets,
+# threads and psycopg2 waits become cooperative
+from gevent import monkey
+monkey.patch_all()
+
+import psycogreen.gevent
+psycogreen.gevent.patch_psycopg()
+
+from app import create_app
+
+# WSGI entry point for production servers, e.g.:
+#   gunicorn -k gevent -w 4 --worker-connections 1000 wsgi:application
+application = create_app()